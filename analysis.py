@@ -0,0 +1,280 @@
+# analysis.py
+import os
+import sys
+import json
+import time
+import struct
+import argparse
+from collections import deque
+from itertools import islice
+from typing import NamedTuple
+from concurrent.futures import ProcessPoolExecutor
+
+import movegen
+from settings import S
+from tetris import Game, KIND_CODE, CODE_KIND, QUEUE_LEN
+from bot import Bot, apply_placement
+
+# Position files, either format; the reader tells them apart by the magic.
+#
+# Text, one position per line ('#' comments and blank lines are skipped):
+#   <rows> <piece> <queue> <hold>
+#   rows   hex row masks of the board top to bottom, '/'-separated, empty
+#          rows above them omitted ('-' for an empty board)
+#   queue  upcoming kinds, e.g. IOLJS ('-' for none); hold a kind or '-'
+#   e.g.   "1ff/3ff T IOLJS -"
+#
+# Binary: MAGIC, then fixed-size records (_RECORD): u16 row masks top to
+# bottom, piece code, queue codes (0-padded), hold code (tetris.KIND_CODE).
+
+MAGIC = b"TPOS"
+_H = S.ROWS + S.HIDDEN_ROWS
+_RECORD = struct.Struct(f"<{_H}HB{QUEUE_LEN}sB")
+_FULL = (1 << S.COLS) - 1
+
+
+class Position(NamedTuple):
+    masks: tuple
+    piece: str
+    queue: str
+    hold: object    # kind or None
+
+
+def position_of(game):
+    return Position(tuple(game.masks), game.cur.kind, "".join(game.queue), game.hold_kind)
+
+
+def encode_text(pos):
+    rows = list(pos.masks)
+    while rows and not rows[0]:
+        rows.pop(0)
+    board = "/".join(f"{m:x}" for m in rows) or "-"
+    return f"{board} {pos.piece} {pos.queue or '-'} {pos.hold or '-'}\n"
+
+
+def encode_record(pos):
+    queue = bytes(KIND_CODE[k] for k in pos.queue[:QUEUE_LEN])
+    return _RECORD.pack(*pos.masks, KIND_CODE[pos.piece], queue, KIND_CODE.get(pos.hold, 0))
+
+
+def _kind(s):
+    if s not in KIND_CODE:
+        raise ValueError(f"bad piece {s!r}")
+    return s
+
+
+def parse_text(line):
+    fields = line.split()
+    if len(fields) != 4:
+        raise ValueError("expected 4 fields")
+    board, piece, queue, hold = fields
+    rows = [] if board == "-" else [int(r, 16) for r in board.split("/")]
+    if len(rows) > _H or any(m < 0 or m > _FULL for m in rows):
+        raise ValueError("bad board")
+    queue = "" if queue == "-" else "".join(_kind(k) for k in queue)
+    return Position((0,) * (_H - len(rows)) + tuple(rows), _kind(piece), queue,
+                    None if hold == "-" else _kind(hold))
+
+
+def parse_record(buf, off=0):
+    *rows, piece, queue, hold = _RECORD.unpack_from(buf, off)
+    if any(m > _FULL for m in rows) or piece not in CODE_KIND or hold and hold not in CODE_KIND:
+        raise ValueError("bad record")
+    queue = "".join(CODE_KIND[c] for c in queue if c)
+    return Position(tuple(rows), CODE_KIND[piece], queue, CODE_KIND.get(hold))
+
+
+# --- Pipeline stages (generators over {"n": ..., ...} items) ---
+
+def parse(start, blob, binary):
+    """Items of a raw chunk: `blob` is text lines or whole records, `start`
+    the index of its first line / record in the file."""
+    if binary:
+        items = ((start + i, off) for i, off in enumerate(range(0, len(blob), _RECORD.size)))
+    else:
+        items = ((start + i, line) for i, line in enumerate(blob.splitlines()))
+    for n, raw in items:
+        try:
+            if binary:
+                pos = parse_record(blob, raw)
+            else:
+                raw = raw.strip()
+                if not raw or raw.startswith(b"#"):
+                    continue
+                pos = parse_text(raw.decode("ascii"))
+        except (ValueError, UnicodeDecodeError, struct.error) as e:
+            yield {"n": n, "error": str(e)}
+            continue
+        yield {"n": n, "pos": pos}
+
+
+def enumerate_placements(items):
+    """Adds "options": (hold?, placement) for the piece and the hold alternative
+    (the held piece, or the next one when hold is empty), as Bot.candidates."""
+    for item in items:
+        pos = item.get("pos")
+        if pos is not None:
+            opts = [(False, p) for p in movegen.placements_on(pos.masks, pos.piece)]
+            alt = pos.hold or (pos.queue[:1] or None)
+            if alt is not None and alt != pos.piece:
+                opts += [(True, p) for p in movegen.placements_on(pos.masks, alt)]
+            item["options"] = opts
+        yield item
+
+
+def evaluate(items, bot, top=1):
+    """Replaces "options" with the `top` best by the bot's evaluator."""
+    for item in items:
+        opts = item.pop("options", None)
+        if opts is not None:
+            scored = []
+            for held, p in opts:
+                after, lines = apply_placement(item["pos"].masks, p, _FULL)
+                scored.append((bot.evaluate(after, S.COLS, lines), lines, held, p))
+            scored.sort(key=lambda s: s[0], reverse=True)
+            item["moves"] = len(opts)
+            item["best"] = scored[:top]
+        yield item
+
+
+def emit(items):
+    """JSON lines: {"n", "moves", "best": [{hold, kind, rot, x, y, lines, score}]}
+    or {"n", "error"}."""
+    for item in items:
+        out = {"n": item["n"]}
+        if "error" in item:
+            out["error"] = item["error"]
+        else:
+            out["moves"] = item["moves"]
+            out["best"] = [{"hold": held, "kind": p.kind, "rot": p.rot, "x": p.x, "y": p.y,
+                            "lines": lines, "score": round(score, 4)}
+                           for score, lines, held, p in item["best"]]
+        yield json.dumps(out) + "\n"
+
+
+# Per-worker bots, one per weight set
+_BOTS = {}
+
+
+def _analyze_chunk(start, blob, binary, weights, top):
+    key = json.dumps(weights, sort_keys=True)
+    bot = _BOTS.get(key)
+    if bot is None:
+        bot = _BOTS[key] = Bot(weights)
+    return "".join(emit(evaluate(enumerate_placements(parse(start, blob, binary)), bot, top)))
+
+
+def _sniff(f, n):
+    # The first n bytes, left unread so a short first line stays whole
+    if hasattr(f, "peek"):
+        return f.peek(n)[:n]
+    pos = f.tell()
+    head = f.read(n)
+    f.seek(pos)
+    return head
+
+
+def read_chunks(f, chunk):
+    """(start index, blob, binary) per `chunk` lines / records of an open
+    binary file; only one chunk is held at a time."""
+    binary = _sniff(f, len(MAGIC)) == MAGIC
+    start = 0
+    if binary:
+        f.read(len(MAGIC))
+        while True:
+            blob = f.read(_RECORD.size * chunk)
+            if not blob:
+                return
+            yield start, blob, True
+            start += len(blob) // _RECORD.size
+    else:
+        while True:
+            lines = list(islice(f, chunk))
+            if not lines:
+                return
+            yield start, b"".join(lines), False
+            start += len(lines)
+
+
+def run(f, out, workers=None, chunk=2048, top=1, weights=None):
+    """Stream every position of `f` through the pipeline to `out` (text),
+    in input order. At most 2 * workers chunks are in flight: reading
+    waits on the oldest chunk, so memory stays flat whatever the input
+    size. workers=0 runs in-process. Returns the number of lines written."""
+    n = 0
+    if workers == 0:
+        for start, blob, binary in read_chunks(f, chunk):
+            text = _analyze_chunk(start, blob, binary, weights, top)
+            out.write(text)
+            n += text.count("\n")
+        return n
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(workers) as pool:
+        inflight = deque()
+        for start, blob, binary in read_chunks(f, chunk):
+            if len(inflight) >= 2 * workers:
+                text = inflight.popleft().result()
+                out.write(text)
+                n += text.count("\n")
+            inflight.append(pool.submit(_analyze_chunk, start, blob, binary, weights, top))
+        while inflight:
+            text = inflight.popleft().result()
+            out.write(text)
+            n += text.count("\n")
+    return n
+
+
+def sample(path, count, seed=0):
+    """Write `count` positions from greedy-bot games (binary when `path`
+    ends in .bin), for trying the pipeline out."""
+    bot = Bot()
+    binary = path.endswith(".bin")
+    with open(path, "wb") as f:
+        if binary:
+            f.write(MAGIC)
+        game = None
+        for _ in range(count):
+            if game is None or game.dead:
+                game = Game(seed=seed, clear_anim=False)
+                seed += 1
+            pos = position_of(game)
+            f.write(encode_record(pos) if binary else encode_text(pos).encode("ascii"))
+            if bot.play(game) is None:
+                game = None
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Stream board positions through placement analysis.")
+    ap.add_argument("input", help="position file (text or binary; '-' = stdin)")
+    ap.add_argument("--out", default="-", help="JSON-lines results ('-' = stdout)")
+    ap.add_argument("--workers", type=int, default=None, help="0 = in-process")
+    ap.add_argument("--chunk", type=int, default=2048, help="positions per worker task")
+    ap.add_argument("--top", type=int, default=1, help="best placements reported per position")
+    ap.add_argument("--weights", help="JSON file of evaluator weights (see bot.WEIGHTS)")
+    ap.add_argument("--sample", type=int, metavar="N", help="write N sample positions to INPUT and exit")
+    args = ap.parse_args(argv)
+
+    if args.sample:
+        sample(args.input, args.sample)
+        return
+    weights = None
+    if args.weights:
+        with open(args.weights, encoding="utf-8") as f:
+            weights = json.load(f)
+
+    src = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    t0 = time.perf_counter()
+    try:
+        n = run(src, out, args.workers, args.chunk, args.top, weights)
+    finally:
+        if src is not sys.stdin.buffer:
+            src.close()
+        if out is not sys.stdout:
+            out.close()
+    dt = time.perf_counter() - t0
+    print(f"{n} positions in {dt:.1f}s ({n / dt:.0f} positions/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
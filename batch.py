@@ -0,0 +1,311 @@
+# batch.py
+import sys
+import time
+
+import numpy as np
+
+from settings import S
+from pieces import PieceSequence, SHAPE_TABLE, PIECES
+from tetris import Game, KIND_CODE, get_kicks
+
+# Board rows are uint32 with the playfield at bits _PAD.._PAD+COLS-1 and wall
+# bits either side; _PAD empty rows sit above the field and _PAD full rows
+# below it, so walls, floor and spawn-area kicks are plain mask tests.
+_PAD = 4
+_COLS_MASK = ((1 << S.COLS) - 1) << _PAD
+_WALLS = 0xFFFFFFFF & ~_COLS_MASK
+_FULL = 0xFFFFFFFF
+_H = S.ROWS + S.HIDDEN_ROWS
+
+# Per kind code (0 = none) and rotation: unshifted 4x4 row bits and block offsets
+SHAPE_BITS = np.zeros((8, 4, 4), dtype=np.uint32)
+SHAPE_BLOCKS = np.zeros((8, 4, 4, 2), dtype=np.int64)
+# KICKS[code, rot, d] -> 5 (dx, dy) tests for turning from rot; d 0 = cw, 1 = ccw
+KICKS = np.zeros((8, 4, 2, 5, 2), dtype=np.int64)
+for _k, _c in KIND_CODE.items():
+    for _r in range(4):
+        _shape = SHAPE_TABLE[_k][_r]
+        for _dy, _bits in _shape.rows:
+            SHAPE_BITS[_c, _r, _dy] = _bits
+        SHAPE_BLOCKS[_c, _r] = _shape.blocks
+        for _d, _to in enumerate(((_r + 1) % 4, (_r - 1) % 4)):
+            _kicks = get_kicks(_k, _r, _to)
+            KICKS[_c, _r, _d] = _kicks + [_kicks[-1]] * (5 - len(_kicks))
+
+LINE_SCORE = np.array([0, 100, 300, 500, 800], dtype=np.int64)
+CODE_CHARS = np.array([""] + PIECES)
+_DY = np.arange(4)
+
+
+def place(game, turns, dx, hold=False):
+    """Play one placement on a Game with the calls a player would make: hold,
+    `turns` clockwise turns (3 == one counter-clockwise), shift, hard drop.
+    BatchGame.step applies the same action to every board at once."""
+    if hold:
+        game.hold()
+    if turns == 3:
+        game.rotate(-1)
+    else:
+        for _ in range(turns):
+            game.rotate(+1)
+    step = 1 if dx > 0 else -1
+    for _ in range(abs(dx)):
+        if not game.move(step):
+            break
+    game.hard_drop()
+
+
+class BatchGame:
+    """B boards stepped in lockstep, one placement (see place()) per board per
+    step. Gravity, DAS and lock delay don't exist here: every action ends in a
+    hard drop, and line clears are immediate (Game(clear_anim=False))."""
+
+    def __init__(self, seeds, randomizer="7bag", lookahead=64):
+        self.size = len(seeds)
+        self.randomizer = randomizer
+        self.lookahead = lookahead
+        B = self.size
+        self.rows = np.empty((B, _H + 2 * _PAD), dtype=np.uint32)
+        self.cells = np.zeros((B, _H, S.COLS), dtype=np.uint8)   # kind codes, for rendering
+        self.kind = np.zeros(B, dtype=np.int64)
+        self.rot = np.zeros(B, dtype=np.int64)
+        self.x = np.zeros(B, dtype=np.int64)
+        self.y = np.zeros(B, dtype=np.int64)
+        self.hold_kind = np.zeros(B, dtype=np.int64)
+        self.score = np.zeros(B, dtype=np.int64)
+        self.lines = np.zeros(B, dtype=np.int64)
+        self.level = np.ones(B, dtype=np.int64)
+        self.dead = np.zeros(B, dtype=bool)
+        # Upcoming kind codes: pieces buf_start .. buf_start + lookahead - 1
+        self.piece_index = np.zeros(B, dtype=np.int64)
+        self.buf = np.zeros((B, lookahead), dtype=np.int64)
+        self.buf_start = np.zeros(B, dtype=np.int64)
+        self.seqs = [None] * B
+        self.reset(seeds=seeds)
+
+    def reset(self, idx=None, seeds=None):
+        """Fresh games on boards `idx` (all by default), optionally with new seeds."""
+        idx = np.arange(self.size) if idx is None else np.asarray(idx, dtype=np.int64)
+        if seeds is None:
+            seeds = [self.seqs[i].seed for i in idx]
+        for i, seed in zip(idx.tolist(), seeds):
+            self.seqs[i] = PieceSequence(seed, self.randomizer)
+        self.rows[idx] = _WALLS
+        self.rows[idx, _PAD + _H:] = _FULL
+        self.cells[idx] = 0
+        self.hold_kind[idx] = 0
+        self.score[idx] = 0
+        self.lines[idx] = 0
+        self.level[idx] = 1
+        self.dead[idx] = False
+        self.piece_index[idx] = 0
+        self._refill(idx)
+        self._spawn(idx)
+
+    @property
+    def masks(self):
+        """(B, rows) occupancy bitmasks laid out like Game.masks."""
+        return (self.rows[:, _PAD:_PAD + _H] & _COLS_MASK) >> _PAD
+
+    def queue(self, depth=5):
+        """(B, depth) kind codes of the preview pieces."""
+        self._refill(np.flatnonzero(self.piece_index + depth > self.buf_start + self.lookahead))
+        cols = (self.piece_index - self.buf_start)[:, None] + np.arange(depth)
+        return np.take_along_axis(self.buf, cols, axis=1)
+
+    def _refill(self, idx):
+        for i in idx.tolist():
+            start = int(self.piece_index[i])
+            self.buf_start[i] = start
+            self.buf[i] = [KIND_CODE[k] for k in self.seqs[i].window(start, self.lookahead)]
+
+    def _collides(self, idx, kind, rot, x, y):
+        piece = SHAPE_BITS[kind, rot] << (x + _PAD)[:, None].astype(np.uint32)
+        board = self.rows[idx[:, None], (y + _PAD)[:, None] + _DY]
+        return (board & piece).any(axis=1)
+
+    def _spawn(self, idx):
+        self._refill(idx[self.piece_index[idx] >= self.buf_start[idx] + self.lookahead])
+        self.kind[idx] = self.buf[idx, self.piece_index[idx] - self.buf_start[idx]]
+        self.piece_index[idx] += 1
+        self.rot[idx] = 0
+        self.x[idx] = 3
+        self.y[idx] = 0
+        self.dead[idx] = self._collides(idx, self.kind[idx], self.rot[idx], self.x[idx], self.y[idx])
+
+    def _hold(self, idx):
+        first = idx[self.hold_kind[idx] == 0]
+        swap = idx[self.hold_kind[idx] != 0]
+        self.hold_kind[first] = self.kind[first]
+        self._spawn(first)
+        self.kind[swap], self.hold_kind[swap] = self.hold_kind[swap], self.kind[swap]
+        self.rot[swap] = 0
+        self.x[swap] = 3
+        self.y[swap] = 0
+        self.dead[swap] = self._collides(swap, self.kind[swap], self.rot[swap], self.x[swap], self.y[swap])
+
+    def _rotate(self, idx, ccw):
+        # First passing SRS test wins, like Game.rotate
+        kind, fr = self.kind[idx], self.rot[idx]
+        to = (fr + np.where(ccw, -1, 1)) % 4
+        kicks = KICKS[kind, fr, ccw.astype(np.int64)]
+        todo = np.ones(len(idx), dtype=bool)
+        for t in range(5):
+            sub = np.flatnonzero(todo)
+            if not len(sub):
+                break
+            nx = self.x[idx[sub]] + kicks[sub, t, 0]
+            ny = self.y[idx[sub]] + kicks[sub, t, 1]
+            ok = ~self._collides(idx[sub], kind[sub], to[sub], nx, ny)
+            hit = idx[sub[ok]]
+            self.rot[hit] = to[sub[ok]]
+            self.x[hit] = nx[ok]
+            self.y[hit] = ny[ok]
+            todo[sub[ok]] = False
+
+    def _shift(self, idx, dx):
+        step = np.sign(dx)
+        left = np.abs(dx)
+        while True:
+            sub = np.flatnonzero(left > 0)
+            if not len(sub):
+                break
+            i = idx[sub]
+            nx = self.x[i] + step[sub]
+            ok = ~self._collides(i, self.kind[i], self.rot[i], nx, self.y[i])
+            self.x[i[ok]] = nx[ok]
+            left[sub] -= 1
+            left[sub[~ok]] = 0
+
+    def _hard_drop(self, idx):
+        kind, rot, x = self.kind[idx], self.rot[idx], self.x[idx]
+        y = self.y[idx].copy()
+        falling = np.arange(len(idx))
+        while len(falling):
+            ok = ~self._collides(idx[falling], kind[falling], rot[falling], x[falling], y[falling] + 1)
+            falling = falling[ok]
+            y[falling] += 1
+        self.score[idx] += 2 * (y - self.y[idx])
+        self.y[idx] = y
+        return self._lock(idx)
+
+    def _lock(self, idx):
+        kind, rot, x, y = self.kind[idx], self.rot[idx], self.x[idx], self.y[idx]
+        piece = SHAPE_BITS[kind, rot] << (x + _PAD)[:, None].astype(np.uint32)
+        for dy in range(4):
+            self.rows[idx, y + _PAD + dy] |= piece[:, dy]
+        self.rows[idx, :_PAD] = _WALLS   # cells above the field are dropped, as in Game._lock
+        blocks = SHAPE_BLOCKS[kind, rot]
+        gx = x[:, None] + blocks[:, :, 0]
+        gy = y[:, None] + blocks[:, :, 1]
+        vis = gy >= 0
+        b = np.broadcast_to(idx[:, None], gx.shape)
+        self.cells[b[vis], gy[vis], gx[vis]] = np.broadcast_to(kind[:, None], gx.shape)[vis]
+
+        full = self.rows[idx, _PAD:_PAD + _H] == _FULL
+        n = full.sum(axis=1)
+        hit = np.flatnonzero(n)
+        if len(hit):
+            self._clear(idx[hit], full[hit], n[hit])
+        self._spawn(idx)
+        return n
+
+    def _clear(self, idx, full, n):
+        self.score[idx] += LINE_SCORE[n] * self.level[idx]
+        self.lines[idx] += n
+        self.level[idx] = 1 + self.lines[idx] // 10
+        # Stable sort puts cleared rows first (they become the fresh empty top
+        # rows) and keeps the survivors in order: one gather per board
+        order = np.argsort(~full, axis=1, kind="stable")
+        field = np.take_along_axis(self.rows[idx, _PAD:_PAD + _H], order, axis=1)
+        cells = np.take_along_axis(self.cells[idx], order[:, :, None], axis=1)
+        top = np.arange(_H) < n[:, None]
+        field[top] = _WALLS
+        cells[top] = 0
+        self.rows[idx, _PAD:_PAD + _H] = field
+        self.cells[idx] = cells
+
+    def step(self, turns, dx, hold=None):
+        """Apply one placement per board (dead boards are skipped); returns
+        the number of lines each board cleared."""
+        turns = np.asarray(turns, dtype=np.int64)
+        dx = np.asarray(dx, dtype=np.int64)
+        if hold is not None:
+            h = np.flatnonzero(np.asarray(hold, dtype=bool) & ~self.dead)
+            if len(h):
+                self._hold(h)
+        live = np.flatnonzero(~self.dead)
+        r = live[turns[live] > 0]
+        self._rotate(r, turns[r] == 3)
+        r = live[turns[live] == 2]
+        self._rotate(r, np.zeros(len(r), dtype=bool))
+        self._shift(live, dx[live])
+        cleared = np.zeros(self.size, dtype=np.int64)
+        cleared[live] = self._hard_drop(live)
+        return cleared
+
+    # --- Parity with the reference engine ---
+    def games(self):
+        """One Game per board on the same seeds, ready for place()."""
+        return [Game(seed=s.seed, clear_anim=False, randomizer=self.randomizer) for s in self.seqs]
+
+    def compare(self, games):
+        """Indices of boards whose state differs from the matching Game."""
+        masks = self.masks
+        bad = []
+        for i, g in enumerate(games):
+            c = g.cur
+            same = (
+                bool(self.dead[i]) == g.dead
+                and int(self.score[i]) == g.score
+                and int(self.lines[i]) == g.lines
+                and int(self.piece_index[i]) == g.piece_index
+                and CODE_CHARS[self.hold_kind[i]] == (g.hold_kind or "")
+                and masks[i].tolist() == g.masks
+                and (g.dead or (CODE_CHARS[self.kind[i]], self.rot[i], self.x[i], self.y[i])
+                     == (c.kind, c.rot, c.x, c.y))
+            )
+            if not same:
+                bad.append(i)
+        return bad
+
+
+def parity(boards=64, steps=500, seed=0):
+    """Random placements on BatchGame and on per-board Games; returns the
+    first (step, board) that diverged, or None."""
+    rng = np.random.default_rng(seed)
+    batch = BatchGame(rng.integers(0, 1 << 32, boards).tolist())
+    games = batch.games()
+    for n in range(steps):
+        turns = rng.integers(0, 4, boards)
+        dx = rng.integers(-5, 6, boards)
+        hold = rng.random(boards) < 0.1
+        batch.step(turns, dx, hold)
+        for g, t, d, h in zip(games, turns.tolist(), dx.tolist(), hold.tolist()):
+            place(g, t, d, h)
+        bad = batch.compare(games)
+        if bad:
+            return n, bad[0]
+        dead = np.flatnonzero(batch.dead)
+        if len(dead):
+            seeds = rng.integers(0, 1 << 32, len(dead)).tolist()
+            batch.reset(dead, seeds)
+            for i, s in zip(dead.tolist(), seeds):
+                games[i] = Game(seed=s, clear_anim=False)
+    return None
+
+
+if __name__ == "__main__":
+    boards = int(sys.argv[1]) if len(sys.argv) > 1 else 4096
+    steps = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    diverged = parity()
+    print("parity:", "OK" if diverged is None else f"FAIL at step/board {diverged}")
+    rng = np.random.default_rng(1)
+    batch = BatchGame(list(range(boards)))
+    t0 = time.perf_counter()
+    for _ in range(steps):
+        batch.step(rng.integers(0, 4, boards), rng.integers(-5, 6, boards))
+        batch.reset(np.flatnonzero(batch.dead))
+    dt = time.perf_counter() - t0
+    print(f"{boards} boards x {steps} steps: {boards * steps / dt:,.0f} placements/s")
+    sys.exit(0 if diverged is None else 1)
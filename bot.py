@@ -0,0 +1,228 @@
+# bot.py
+import time
+import queue
+import threading
+import multiprocessing as mp
+
+import movegen
+from tetris import Game
+
+# Evaluator weights (per feature of the board left after a placement)
+WEIGHTS = {
+    "height": -0.51,     # aggregate column height
+    "lines": 0.76,       # lines cleared by the placement
+    "holes": -0.36,      # empty cells with a filled cell somewhere above
+    "bumpiness": -0.18,  # sum of height steps between neighbouring columns
+    "wells": -0.10,      # depth of columns lower than both neighbours (walls count as high)
+}
+
+
+def apply_placement(masks, placement, full_mask):
+    """Row masks after locking `placement` and removing full rows; returns
+    (masks, lines cleared)."""
+    out = list(masks)
+    for y, bits in placement.rows():
+        if y >= 0:
+            out[y] |= bits
+    kept = [m for m in out if m != full_mask]
+    cleared = len(out) - len(kept)
+    return [0] * cleared + kept, cleared
+
+
+def features(masks, cols, lines=0):
+    h = len(masks)
+    heights = [0] * cols
+    seen = holes = 0
+    for y, m in enumerate(masks):
+        holes += (seen & ~m).bit_count()
+        new = m & ~seen
+        if new:
+            for x in range(cols):
+                if new >> x & 1:
+                    heights[x] = h - y
+            seen |= m
+    bump = sum(abs(heights[i] - heights[i + 1]) for i in range(cols - 1))
+    wells = 0
+    for x in range(cols):
+        left = heights[x - 1] if x > 0 else h
+        right = heights[x + 1] if x < cols - 1 else h
+        depth = min(left, right) - heights[x]
+        if depth > 0:
+            wells += depth
+    return {"height": sum(heights), "lines": lines, "holes": holes,
+            "bumpiness": bump, "wells": wells}
+
+
+class Bot:
+    """One-piece greedy player: scores every reachable placement of the
+    current piece (and of the hold alternative) with a weighted evaluator."""
+
+    def __init__(self, weights=None):
+        self.weights = dict(WEIGHTS, **(weights or {}))
+
+    def evaluate(self, masks, cols, lines=0):
+        f = features(masks, cols, lines)
+        return sum(w * f[k] for k, w in self.weights.items())
+
+    def candidates(self, game):
+        """(path, placement) for the current piece, plus the hold alternative."""
+        out = [((), p) for p in movegen.placements(game)]
+        if not game.hold_used:
+            alt = game.hold_kind or (game.queue[0] if game.queue else None)
+            if alt is not None and alt != game.cur.kind:
+                out += [(("hold",), p) for p in movegen.placements(game, kind=alt, start=(3, 0, 0))]
+        return out
+
+    def choose(self, game):
+        """Best (input path, placement), or None if the game can't move."""
+        if game.dead or game.clear_anim_t > 0:
+            return None
+        best, best_score = None, None
+        for prefix, p in self.candidates(game):
+            masks, lines = apply_placement(game.masks, p, game.full_mask)
+            score = self.evaluate(masks, game.cols, lines)
+            if best_score is None or score > best_score:
+                best, best_score = (prefix + p.path, p), score
+        return best
+
+    def think(self, game, stop=lambda: False):
+        """Anytime search: yields an input path each time a better one is
+        found, the greedy choice first, then two-piece lookahead (this piece
+        and the next). Returns early once stop() is true."""
+        if game.dead or game.clear_anim_t > 0:
+            return
+        first = []
+        for prefix, p in self.candidates(game):
+            masks, lines = apply_placement(game.masks, p, game.full_mask)
+            first.append((self.evaluate(masks, game.cols, lines), prefix + p.path, masks, lines))
+        if not first:
+            return
+        first.sort(key=lambda c: c[0], reverse=True)
+        yield first[0][1]
+
+        queue_ = game.queue
+        best, best_path = None, first[0][1]
+        for _, path, masks, lines in first:
+            if stop():
+                return
+            # The piece after this one: one further down if hold pulled the next piece in
+            i = 1 if path[:1] == ("hold",) and game.hold_kind is None else 0
+            if i >= len(queue_):
+                return
+            score = max(self.evaluate(after, game.cols, lines + more)
+                        for after, more in (apply_placement(masks, p, game.full_mask)
+                                            for p in movegen.placements_on(masks, queue_[i])))
+            if best is None or score > best:
+                best = score
+                if path != best_path:
+                    best_path = path
+                    yield path
+
+    def play(self, game):
+        """Place one piece through Game's player calls; returns the placement."""
+        choice = self.choose(game)
+        if choice is None:
+            return None
+        path, placement = choice
+        movegen.play(game, path)
+        return placement
+
+
+def _serve(conn, weights, depth):
+    # Worker loop: one search at a time; a newer request (or "quit") arriving
+    # mid-search cancels it
+    bot = Bot(weights)
+    if depth:
+        from search import Search
+        bot = Search(bot, depth)
+    pending = None
+    while True:
+        msg = pending if pending is not None else conn.recv()
+        pending = None
+        if msg == "quit":
+            break
+        req, state, budget = msg
+        deadline = time.perf_counter() + budget
+
+        def stop():
+            nonlocal pending
+            if pending is None and conn.poll():
+                pending = conn.recv()
+            return pending is not None or time.perf_counter() >= deadline
+
+        for path in bot.think(Game.from_state(state), stop):
+            conn.send((req, path, False))
+            if stop():
+                break
+        if pending is None:
+            conn.send((req, None, True))
+
+
+class _QueueConn:
+    """The slice of the multiprocessing Connection API _serve uses, over queues."""
+
+    def __init__(self, inbox, outbox):
+        self.inbox, self.outbox = inbox, outbox
+
+    def send(self, obj):
+        self.outbox.put(obj)
+
+    def recv(self):
+        return self.inbox.get()
+
+    def poll(self):
+        return not self.inbox.empty()
+
+
+class BotWorker:
+    """Bot search off the UI thread: submit() sends a state snapshot with a
+    time budget, poll() collects the best path found so far. Each submit()
+    supersedes the previous request; stale replies are ignored by id.
+    depth > 0 searches that many pieces ahead (search.Search) instead of
+    Bot.think. thread=True runs the search on a thread (web builds)."""
+
+    def __init__(self, weights=None, thread=False, depth=0):
+        if thread:
+            a, b = queue.Queue(), queue.Queue()
+            self.conn = _QueueConn(b, a)
+            self.proc = threading.Thread(target=_serve, args=(_QueueConn(a, b), weights, depth), daemon=True)
+            self.proc.start()
+        else:
+            # spawn: a forked child would inherit the parent's SDL state and signal handlers
+            ctx = mp.get_context("spawn")
+            self.conn, child = ctx.Pipe()
+            self.proc = ctx.Process(target=_serve, args=(child, weights, depth), daemon=True)
+            self.proc.start()
+            child.close()
+        self.req = 0
+        self.best = None
+        self.done = True
+        self.deadline = 0.0
+
+    def submit(self, game, budget):
+        self.req += 1
+        self.best = None
+        self.done = False
+        self.deadline = time.perf_counter() + budget
+        self.conn.send((self.req, game.dump_state(), budget))
+
+    def poll(self):
+        while self.conn.poll():
+            req, path, final = self.conn.recv()
+            if req != self.req:
+                continue
+            if path is not None:
+                self.best = path
+            self.done = final
+        return self.best
+
+    def ready(self):
+        """A move is available and the search finished or ran out of time."""
+        return self.best is not None and (self.done or time.perf_counter() >= self.deadline)
+
+    def close(self):
+        try:
+            self.conn.send("quit")
+        except (BrokenPipeError, OSError):
+            pass
+        self.proc.join(timeout=1)
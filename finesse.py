@@ -0,0 +1,139 @@
+# finesse.py
+import sys
+import json
+from collections import deque
+from pathlib import Path
+
+from settings import S
+from pieces import PIECES, SHAPE_TABLE
+from tetris import Game, Piece, get_kicks, IN_LEFT, IN_RIGHT, IN_CW, IN_CCW, IN_HOLD
+
+# Minimal presses to bring a piece from spawn to each (rotation, column) on an
+# empty board, then hard drop. A tap moves one column, a held LEFT / RIGHT
+# (DAS) runs to the wall: both are one press, like a rotation.
+TABLE_VERSION = 1
+CACHE_PATH = Path(__file__).with_name("finesse_table.json")
+
+
+def _landing_key(kind, rot, x):
+    # Placements that cover the same cells (I/S/Z/O symmetries) share a key
+    shape = SHAPE_TABLE[kind][rot]
+    return tuple((dy - shape.top, bits) for dy, bits in shape.shifted[x])
+
+
+def build_table():
+    """{kind: {"rot:x": presses}} by BFS from the spawn position on an empty board."""
+    game = Game(seed=0)
+    table = {}
+    for kind in PIECES:
+        piece = Piece(kind, 3, 0)
+
+        def slide(x, y, rot, dx, far):
+            while not game._collides(piece, rot=rot, x=x + dx, y=y):
+                x += dx
+                if not far:
+                    break
+            return x
+
+        # BFS over (x, y, rot): y only moves through kicks, as in Game.rotate
+        cost = {(3, 0, 0): 0}
+        frontier = deque([(3, 0, 0)])
+        while frontier:
+            x, y, rot = frontier.popleft()
+            nxt = [(slide(x, y, rot, d, far), y, rot) for d in (-1, 1) for far in (False, True)]
+            if kind != "O":
+                for d in (1, -1):
+                    nr = (rot + d) % 4
+                    for ox, oy in get_kicks(kind, rot, nr):
+                        if not game._collides(piece, rot=nr, x=x + ox, y=y + oy):
+                            nxt.append((x + ox, y + oy, nr))
+                            break
+            for s in nxt:
+                if s not in cost:
+                    cost[s] = cost[(x, y, rot)] + 1
+                    frontier.append(s)
+
+        best = {}
+        for (x, _, rot), c in cost.items():
+            key = _landing_key(kind, rot, x)
+            best[key] = min(best.get(key, c), c)
+        table[kind] = {f"{rot}:{x}": best[_landing_key(kind, rot, x)] for (x, _, rot) in cost}
+    return table
+
+
+def load_table(path=CACHE_PATH):
+    """The table from the disk cache, rebuilt (and re-cached) when missing or stale."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") == TABLE_VERSION and data.get("cols") == S.COLS:
+            return data["table"]
+    except (OSError, ValueError):
+        pass
+    table = build_table()
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"version": TABLE_VERSION, "cols": S.COLS, "table": table}, f)
+    except OSError:
+        pass   # read-only install / web: keep it in memory
+    return table
+
+
+class FinesseAnalyzer:
+    """Game observer that counts key presses per piece (feed() gets the same
+    IN_* mask as Game.step) and, on each lock, compares them with the table.
+    Pieces tucked under an overhang aren't judged: a hard drop can't reach them."""
+
+    def __init__(self, table=None):
+        self.table = table if table is not None else load_table()
+        self.on_reset(None)
+
+    def attach(self, game):
+        game.observers.append(self)
+        return self
+
+    def on_reset(self, game):
+        self.held = 0
+        self.presses = 0
+        self.faults = 0
+        self.pieces = 0
+        self.faulty = 0
+        self.last = None    # (kind, presses, optimal) of the last judged piece
+
+    def feed(self, inputs):
+        pressed = inputs & ~self.held & (IN_LEFT | IN_RIGHT)
+        self.held = inputs & (IN_LEFT | IN_RIGHT)
+        if inputs & IN_HOLD:
+            self.presses = 0     # counting starts over with the piece from hold
+        self.presses += bin(pressed).count("1") + bool(inputs & IN_CW) + bool(inputs & IN_CCW)
+
+    def on_lock(self, game):
+        p = game.cur
+        presses, self.presses = self.presses, 0
+        if any(game._collides(p, y=y) for y in range(0, p.y)):
+            return
+        optimal = self.table[p.kind].get(f"{p.rot}:{p.x}")
+        if optimal is None:
+            return
+        self.pieces += 1
+        self.last = (p.kind, presses, optimal)
+        if presses > optimal:
+            self.faults += presses - optimal
+            self.faulty += 1
+
+
+def analyze(source):
+    """Run a Replay / ReplayReader and return its FinesseAnalyzer."""
+    game = source.game_at(0)
+    fin = FinesseAnalyzer().attach(game)
+    for v, n in source.runs():
+        fin.feed(v)
+        game.step(v, n)
+    return fin
+
+
+if __name__ == "__main__":
+    from replay import open_replay
+    for arg in sys.argv[1:]:
+        fin = analyze(open_replay(arg))
+        print(f"{arg}: {fin.pieces} pieces judged, {fin.faulty} with faults, {fin.faults} extra presses")
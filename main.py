@@ -1,13 +1,37 @@
 # main.py
+import io
 import sys
 import time
+import random
+from collections import deque
 import pygame
 
 from settings import S
-from tetris import Game
+from tetris import Game, IN_LEFT, IN_RIGHT, IN_SOFT, IN_CW, IN_CCW, IN_HARD, IN_HOLD
+from replay import ReplayWriter, ReplayReader, Player
+from practice import Rewind
+from bot import Bot, BotWorker
+from finesse import FinesseAnalyzer
+from pc import PCSolver, PCCache, overlay
+from versus import Versus
+import movegen
 from ui import UI
 from effects import Particles, ScreenShake
-from platform_store import load_high_score, save_high_score, IS_WEB
+from platform_store import (
+    load_high_score, save_high_score, load_last_replay, save_last_replay,
+    load_suspended, save_suspended, clear_suspended, IS_WEB,
+)
+
+# Suspended game blob: magic, practice flag, Game.dump_state()
+SUSPEND_MAGIC = b"TSUS"
+
+# Versus controls per player: held (left, right, soft drop) keys, one-shot keys
+VS_KEYS = (
+    ((pygame.K_a, pygame.K_d, pygame.K_s),
+     {pygame.K_w: IN_HARD, pygame.K_q: IN_CCW, pygame.K_e: IN_CW, pygame.K_LSHIFT: IN_HOLD}),
+    ((pygame.K_LEFT, pygame.K_RIGHT, pygame.K_DOWN),
+     {pygame.K_UP: IN_HARD, pygame.K_COMMA: IN_CCW, pygame.K_PERIOD: IN_CW, pygame.K_SLASH: IN_HOLD}),
+)
 
 
 class EffectsBundle:
@@ -29,6 +53,233 @@ def _init_display():
     return screen, ui
 
 
+def _new_game(effects, state_box, practice=None, game=None):
+    """Fresh (or resumed) run. Practice runs get a rewind history instead of a
+    recording (a rewind is not an input, so it could not be replayed)."""
+    _finish_run(state_box)
+    if practice is None:
+        practice = state_box.get("rewind") is not None
+    if game is None:
+        game = Game(effects=effects, seed=random.getrandbits(32), fixed_tick=True)
+    if practice:
+        state_box["rewind"] = Rewind().attach(game)
+        state_box["recorder"] = None
+    else:
+        state_box["rewind"] = None
+        state_box["recorder"] = ReplayWriter(io.BytesIO(), game)
+    state_box["finesse"] = FinesseAnalyzer(state_box.get("finesse_table")).attach(game)
+    state_box["finesse_table"] = state_box["finesse"].table
+    state_box["edge"] = 0
+    # Shift pressed since the last step: kept until stepped, so a tap released
+    # within the same frame (or a frame with no tick) still moves the piece
+    state_box["tap"] = 0
+    state_box["held"] = {"left": False, "right": False}
+    return game
+
+
+def _suspend(state_box, game):
+    """Park an unfinished game so the menu can offer to resume it."""
+    if game is None or game.dead:
+        return
+    practice = state_box.get("rewind") is not None
+    save_suspended(SUSPEND_MAGIC + bytes((practice,)) + game.dump_state())
+    state_box["suspended"] = True
+
+
+def _resume(effects, state_box):
+    data = load_suspended()
+    game = None
+    if data and data[:4] == SUSPEND_MAGIC:
+        try:
+            game = Game.from_state(data[5:], effects=effects)
+        except Exception:
+            game = None
+    clear_suspended()
+    state_box["suspended"] = False
+    if game is None:
+        return None
+    return _new_game(effects, state_box, practice=bool(data[4]), game=game)
+
+
+def _ranked_score(state_box, game):
+    """Score that counts toward the high score (practice runs don't)."""
+    return 0 if state_box.get("rewind") is not None else game.score
+
+
+def _finish_run(state_box):
+    """Close the current recording (if any) and keep it as the last replay."""
+    rec = state_box.get("recorder")
+    if rec is None:
+        return
+    state_box["recorder"] = None
+    if rec.ticks == 0:
+        return
+    rec.close()
+    data = rec.f.getvalue()
+
+    # The previous reader may map the file we are about to overwrite
+    old = state_box.get("replay")
+    if old is not None:
+        old.close()
+    state_box["replay"] = ReplayReader(data)
+    save_last_replay(data)
+
+
+def _load_replay():
+    src = load_last_replay()
+    if src is None:
+        return None
+    try:
+        return ReplayReader(src)
+    except Exception:
+        return None
+
+
+def _new_autoplay(effects, state_box):
+    """Bot-driven run (attract mode / renderer soak test): not recorded and
+    never counted toward the high score."""
+    state_box["bot"] = Bot()
+    state_box["bot_acc"] = 0.0
+    state_box["bot_times"] = deque()
+    state_box["bot_key"] = None
+    state_box["bot_due"] = 0.0
+    return Game(effects=effects, seed=random.getrandbits(32), fixed_tick=True, clear_anim=False)
+
+
+def _bot_worker(state_box):
+    """Search worker for autoplay, started on first use (a thread on web);
+    None when neither can start, and the bot then thinks inside the frame."""
+    if "worker" not in state_box:
+        try:
+            state_box["worker"] = BotWorker(thread=IS_WEB, depth=S.BOT_DEPTH)
+        except (OSError, RuntimeError, ImportError):
+            state_box["worker"] = None
+    return state_box["worker"]
+
+
+def _bot_turn(state_box, game, dt):
+    """Let the bot place pieces at up to S.BOT_PPS; returns pieces placed in
+    the last second."""
+    times = state_box["bot_times"]
+    worker = _bot_worker(state_box)
+    if worker is not None:
+        # Each piece gets a 1 / S.BOT_PPS time slot and is played when it
+        # ends. The search is budgeted at what's left of the slot; a hold, a
+        # new piece or gravity moving the piece supersedes it, so the path
+        # always starts from where the piece is now
+        if not game.dead and game.clear_anim_t == 0:
+            now = time.perf_counter()
+            key = (game.piece_index, game.hold_used, game.cur.x, game.cur.y, game.cur.rot)
+            last = state_box.get("bot_key")
+            if last is None or key[0] != last[0]:
+                state_box["bot_due"] = max(state_box["bot_due"] + 1.0 / S.BOT_PPS, now)
+            if key != last:
+                state_box["bot_key"] = key
+                worker.submit(game, max(state_box["bot_due"] - now, 0.0))
+            worker.poll()
+            if worker.ready() and now >= state_box["bot_due"]:
+                movegen.play(game, worker.best)
+                times.append(now)
+    else:
+        # Inline: this frame's share of pieces, giving up after half a frame
+        # so rendering keeps S.FPS; a backlog is dropped, not bursted later
+        acc = state_box["bot_acc"] + dt * S.BOT_PPS
+        deadline = time.perf_counter() + 0.5 / S.FPS
+        while acc >= 1 and not game.dead and time.perf_counter() < deadline:
+            if state_box["bot"].play(game) is None:
+                break
+            acc -= 1
+            times.append(time.perf_counter())
+        state_box["bot_acc"] = min(acc, 1.0)
+    now = time.perf_counter()
+    while times and now - times[0] > 1.0:
+        times.popleft()
+    return len(times)
+
+
+def _pc_turn(state_box, game):
+    """Perfect-clear suggestion for practice runs, searched in a slice of
+    each frame and again whenever the board or pieces change; the overlay
+    steps (pc.overlay), or None."""
+    if game.dead or game.clear_anim_t > 0:
+        return None
+    key = (game.piece_index, game.hold_used, tuple(game.masks))
+    if key != state_box.get("pc_key"):
+        if state_box.get("pc_solver") is None:
+            state_box["pc_solver"] = PCSolver(PCCache())
+        state_box["pc_key"] = key
+        state_box["pc_search"] = state_box["pc_solver"].search_game(game)
+        state_box["pc"] = None
+    search = state_box["pc_search"]
+    deadline = time.perf_counter() + 0.25 / S.FPS
+    while search is not None and time.perf_counter() < deadline:
+        steps = next(search)
+        if steps is not None:
+            state_box["pc"] = overlay(game.masks, steps) if steps else None
+            state_box["pc_search"] = search = None
+    return state_box["pc"]
+
+
+def _take_ticks(state_box, dt):
+    """Whole simulation ticks elapsed this frame (fractional time carries over)."""
+    acc = state_box.get("tick_acc", 0.0) + dt
+    n = int(acc * S.TICK_RATE)
+    state_box["tick_acc"] = acc - n / S.TICK_RATE
+    return n
+
+
+def _draw_board(ui, game, shake=(0, 0)):
+    ui.draw_grid_cells(game, shake=shake)
+    if not game.dead:
+        gy = game.ghost_y()
+        ghost = type(game.cur)(game.cur.kind, game.cur.x, gy)
+        ghost.rot = game.cur.rot
+        ui.draw_piece(ghost, alpha=180, ghost=True, shake=shake)
+        ui.draw_piece(game.cur, shake=shake)
+
+
+def _draw_versus(ui, views, vs, t):
+    for i, view in enumerate(views):
+        view.draw_background(t, fill=i == 0)
+    for i, (view, game) in enumerate(zip(views, vs.games)):
+        _draw_board(view, game)
+        view.draw_versus_side(game, vs.pending(i), vs.sent[i], left=i == 0)
+    if vs.winner is not None:
+        ui.draw_versus_result(vs.winner)
+    elif vs.games[0].paused:
+        ui.draw_pause_overlay()
+
+
+def _draw_game(ui, screen, effects, game, t, high_score, shake, finesse=None):
+    # Line-clear particles on cleared rows (visual only)
+    rows = getattr(game, "just_cleared_rows", [])
+    if rows:
+        br = ui.board_rect()
+        for ry in rows:
+            vy = ry - S.HIDDEN_ROWS
+            if 0 <= vy < S.ROWS:
+                y_px = br.y + vy * S.TILE + S.TILE // 2
+                for k in range(6):
+                    x_px = br.x + int((k + 0.5) * br.w / 6)
+                    effects.particles.burst(
+                        x_px, y_px,
+                        (235, 235, 245),
+                        n=18, spread=220, speed=(160, 520)
+                    )
+        game.just_cleared_rows = []
+
+    # Render
+    ui.draw_background(t, shake=shake)
+    _draw_board(ui, game, shake)
+    ui.draw_panel(game, t, high_score=high_score, shake=shake, finesse=finesse)
+    effects.particles.draw(screen, shake=shake)
+
+    if game.paused:
+        ui.draw_pause_overlay(shake=shake)
+
+    ui.draw_game_over(game, shake=shake)
+
+
 def _run_frame(clock, screen, ui, effects, state_box):
     """One frame of the game. Returns (running: bool)."""
     state = state_box["state"]
@@ -44,14 +295,45 @@ def _run_frame(clock, screen, ui, effects, state_box):
             return False
 
         if e.type == pygame.KEYDOWN:
+            # A new game over a parked run asks first: pressing ENTER / T in
+            # the menu again discards it, any other key backs out
+            confirm, state_box["discard"] = state_box.get("discard", False), False
+
             # Global keys
             if e.key == pygame.K_F1:
                 state = "help" if state != "help" else "menu"
 
             if state == "menu":
+                if e.key in (pygame.K_RETURN, pygame.K_KP_ENTER, pygame.K_t) and state_box.get("suspended"):
+                    if not confirm:
+                        state_box["discard"] = True
+                        continue
+                    clear_suspended()
+                    state_box["suspended"] = False
                 if e.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
-                    game = Game(effects=effects)
+                    game = _new_game(effects, state_box, practice=False)
                     state = "play"
+                elif e.key == pygame.K_t:
+                    game = _new_game(effects, state_box, practice=True)
+                    state = "play"
+                elif e.key == pygame.K_r and state_box.get("suspended"):
+                    game = _resume(effects, state_box)
+                    if game is not None:
+                        state = "play"
+                elif e.key == pygame.K_a:
+                    game = _new_autoplay(effects, state_box)
+                    state = "autoplay"
+                elif e.key == pygame.K_2:
+                    state_box["versus"] = Versus()
+                    state_box["vs_edge"] = [0, 0]
+                    if state_box.get("vs_views") is None:
+                        state_box["vs_views"] = ui.versus_views()
+                    game = None
+                    state = "versus"
+                elif e.key == pygame.K_v and state_box.get("replay") is not None:
+                    state_box["player"] = Player(state_box["replay"], effects=effects)
+                    game = state_box["player"].game
+                    state = "replay"
                 elif e.key in (pygame.K_h, pygame.K_SLASH, pygame.K_QUESTION):
                     state = "help"
                 elif e.key == pygame.K_ESCAPE:
@@ -62,19 +344,67 @@ def _run_frame(clock, screen, ui, effects, state_box):
             elif state == "help":
                 if e.key in (pygame.K_ESCAPE, pygame.K_BACKSPACE):
                     state = "menu"
+                elif e.key in (pygame.K_RETURN, pygame.K_KP_ENTER) and state_box.get("suspended"):
+                    # Over a parked run: to the menu's discard confirmation
+                    state_box["discard"] = True
+                    state = "menu"
                 elif e.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
-                    game = Game(effects=effects)
+                    game = _new_game(effects, state_box, practice=False)
                     state = "play"
 
+            elif state == "replay":
+                player = state_box["player"]
+                if e.key in (pygame.K_ESCAPE, pygame.K_RETURN, pygame.K_KP_ENTER, pygame.K_BACKSPACE):
+                    state_box["player"] = None
+                    game = None
+                    state = "menu"
+                # Scrub: jumps go through the nearest keyframe, not from tick 0
+                elif e.key in (pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_DOWN, pygame.K_HOME):
+                    step = {
+                        pygame.K_LEFT: -5, pygame.K_RIGHT: 5,
+                        pygame.K_DOWN: -60, pygame.K_UP: 60,
+                    }.get(e.key, 0) * S.TICK_RATE
+                    player.seek(player.pos + step if step else 0)
+                    game = player.game
+
+            elif state == "autoplay":
+                if e.key in (pygame.K_ESCAPE, pygame.K_RETURN, pygame.K_KP_ENTER, pygame.K_BACKSPACE):
+                    state_box["bot"] = None
+                    game = None
+                    state = "menu"
+                elif e.key == pygame.K_p:
+                    game.toggle_pause()
+
+            elif state == "versus":
+                vs = state_box["versus"]
+                if e.key in (pygame.K_ESCAPE, pygame.K_RETURN, pygame.K_KP_ENTER):
+                    state_box["versus"] = None
+                    state = "menu"
+                elif e.key == pygame.K_r and vs.winner is not None:
+                    state_box["versus"] = Versus()
+                    state_box["vs_edge"] = [0, 0]
+                elif e.key == pygame.K_p and vs.winner is None:
+                    vs.toggle_pause()
+                else:
+                    for i, (_, edges) in enumerate(VS_KEYS):
+                        state_box["vs_edge"][i] |= edges.get(e.key, 0)
+
             elif state == "play":
+                # Practice rewind (also works from the game-over screen)
+                if e.key == pygame.K_BACKSPACE and state_box.get("rewind") is not None:
+                    n = 10 if e.mod & pygame.KMOD_SHIFT else 1
+                    state_box["rewind"].rewind(game, n)
+                    continue
+
                 # If dead: allow quick actions
                 if game.dead:
                     if e.key == pygame.K_r:
-                        game.reset()
+                        game = _new_game(effects, state_box)
                     elif e.key in (pygame.K_RETURN, pygame.K_KP_ENTER, pygame.K_ESCAPE):
                         # save and return to menu
-                        high_score = max(high_score, game.score)
+                        high_score = max(high_score, _ranked_score(state_box, game))
                         save_high_score(high_score)
+                        _finish_run(state_box)
                         game = None
                         state = "menu"
                     continue
@@ -85,9 +415,11 @@ def _run_frame(clock, screen, ui, effects, state_box):
                     continue
 
                 if e.key == pygame.K_ESCAPE:
-                    # back to menu (save)
-                    high_score = max(high_score, game.score)
+                    # back to menu (save, and park the run for resuming)
+                    high_score = max(high_score, _ranked_score(state_box, game))
                     save_high_score(high_score)
+                    _finish_run(state_box)
+                    _suspend(state_box, game)
                     game = None
                     state = "menu"
                     continue
@@ -95,54 +427,48 @@ def _run_frame(clock, screen, ui, effects, state_box):
                 if game.paused:
                     continue
 
-                # Controls
+                # Controls: collected as Game.step input bits for the next tick
+                held = state_box["held"]
                 if e.key == pygame.K_r:
-                    game.reset()
+                    game = _new_game(effects, state_box)
+                    continue
 
                 if e.key == pygame.K_LEFT:
-                    game.left_held = True
-                    game.right_held = False
-                    game.move(-1)
-                    game.last_dir = -1
-                    game.das_t = 0.0
-                    game.arr_t = 0.0
+                    held["left"] = True
+                    held["right"] = False
+                    state_box["tap"] = IN_LEFT
 
                 if e.key == pygame.K_RIGHT:
-                    game.right_held = True
-                    game.left_held = False
-                    game.move(+1)
-                    game.last_dir = +1
-                    game.das_t = 0.0
-                    game.arr_t = 0.0
-
-                if e.key == pygame.K_DOWN:
-                    game.soft_drop = True
+                    held["right"] = True
+                    held["left"] = False
+                    state_box["tap"] = IN_RIGHT
 
                 if e.key == pygame.K_z:
-                    game.rotate(-1)
+                    state_box["edge"] |= IN_CCW
                 if e.key == pygame.K_x or e.key == pygame.K_UP:
-                    game.rotate(+1)
+                    state_box["edge"] |= IN_CW
 
                 if e.key == pygame.K_c:
-                    game.hold()
+                    state_box["edge"] |= IN_HOLD
 
                 if e.key == pygame.K_SPACE:
-                    game.hard_drop()
+                    state_box["edge"] |= IN_HARD
 
         if e.type == pygame.KEYUP and state == "play" and game is not None:
             if e.key == pygame.K_LEFT:
-                game.left_held = False
+                state_box["held"]["left"] = False
             if e.key == pygame.K_RIGHT:
-                game.right_held = False
-            if e.key == pygame.K_DOWN:
-                game.soft_drop = False
+                state_box["held"]["right"] = False
 
     # Update / render per state
     shake = effects.shake.offset()
 
     if state == "menu":
         ui.draw_background(t, shake=shake)
-        ui.draw_title_screen(t, high_score=high_score, shake=shake)
+        ui.draw_title_screen(t, high_score=high_score, shake=shake,
+                             has_replay=state_box.get("replay") is not None,
+                             can_resume=bool(state_box.get("suspended")),
+                             confirm_discard=state_box.get("discard", False))
         effects.particles.update(dt)
         effects.shake.update(S.SHAKE_DECAY)
 
@@ -154,52 +480,76 @@ def _run_frame(clock, screen, ui, effects, state_box):
 
     elif state == "play":
         keys = pygame.key.get_pressed()
-        game.soft_drop = bool(keys[pygame.K_DOWN]) if not game.dead else False
+        n = _take_ticks(state_box, dt)
+        if n and not game.dead:
+            held = state_box["held"]
+            bits = (IN_LEFT if held["left"] else 0) | (IN_RIGHT if held["right"] else 0)
+            if keys[pygame.K_DOWN]:
+                bits |= IN_SOFT
+            driver = state_box["recorder"] or game
+            # A tap no longer held is stepped for one tick, so it shifts once
+            # and never reaches DAS
+            tap = state_box["tap"] & ~bits
+            if tap:
+                runs = [(bits | tap | state_box["edge"], 1), (bits, n - 1)]
+            else:
+                runs = [(bits | state_box["edge"], n)]
+            for inputs, k in runs:
+                if k:
+                    state_box["finesse"].feed(inputs)
+                    driver.step(inputs, k)
+            state_box["edge"] = 0
+            state_box["tap"] = 0
+            if game.dead:
+                _finish_run(state_box)
 
-        game.update(dt)
         effects.particles.update(dt)
         effects.shake.update(S.SHAKE_DECAY)
-
-        # Line-clear particles on cleared rows (visual only)
-        rows = getattr(game, "just_cleared_rows", [])
-        if rows:
-            br = ui.board_rect()
-            for ry in rows:
-                vy = ry - S.HIDDEN_ROWS
-                if 0 <= vy < S.ROWS:
-                    y_px = br.y + vy * S.TILE + S.TILE // 2
-                    for k in range(6):
-                        x_px = br.x + int((k + 0.5) * br.w / 6)
-                        effects.particles.burst(
-                            x_px, y_px,
-                            (235, 235, 245),
-                            n=18, spread=220, speed=(160, 520)
-                        )
-            game.just_cleared_rows = []
-
-        # Render
-        ui.draw_background(t, shake=shake)
-        ui.draw_grid_cells(game, shake=shake)
-
-        if not game.dead:
-            gy = game.ghost_y()
-            ghost = type(game.cur)(game.cur.kind, game.cur.x, gy)
-            ghost.rot = game.cur.rot
-            ui.draw_piece(ghost, alpha=180, ghost=True, shake=shake)
-            ui.draw_piece(game.cur, shake=shake)
-
-        ui.draw_panel(game, t, high_score=high_score, shake=shake)
-        effects.particles.draw(screen, shake=shake)
-
-        if game.paused:
-            ui.draw_pause_overlay(shake=shake)
-
-        ui.draw_game_over(game, shake=shake)
-
-        if game.dead and game.score > high_score:
+        _draw_game(ui, screen, effects, game, t, high_score, shake, finesse=state_box["finesse"])
+        if state_box.get("rewind") is not None:
+            ui.draw_practice_hint(len(state_box["rewind"]))
+            steps = _pc_turn(state_box, game)
+            if steps and not game.paused:
+                ui.draw_pc_hint(steps, shake=shake)
+
+        if game.dead and _ranked_score(state_box, game) > high_score:
             high_score = game.score
             save_high_score(high_score)
 
+    elif state == "versus":
+        vs = state_box["versus"]
+        n = _take_ticks(state_box, dt)
+        if n:
+            keys = pygame.key.get_pressed()
+            inputs = []
+            for (left, right, soft), _ in VS_KEYS:
+                bits = (IN_LEFT if keys[left] else 0) | (IN_RIGHT if keys[right] else 0)
+                inputs.append(bits | (IN_SOFT if keys[soft] else 0))
+            vs.step([b | e for b, e in zip(inputs, state_box["vs_edge"])], n)
+            state_box["vs_edge"] = [0, 0]
+        _draw_versus(ui, state_box["vs_views"], vs, t)
+
+    elif state == "replay":
+        player = state_box["player"]
+        player.advance(_take_ticks(state_box, dt))
+        effects.particles.update(dt)
+        effects.shake.update(S.SHAKE_DECAY)
+        _draw_game(ui, screen, effects, game, t, high_score, shake)
+        ui.draw_replay_bar(player.pos, player.source.ticks, S.TICK_RATE)
+
+    elif state == "autoplay":
+        # Attract mode loops: a finished game is replaced straight away
+        if game.dead:
+            game = _new_autoplay(effects, state_box)
+        pps = 0
+        if not game.paused:
+            game.step(0, _take_ticks(state_box, dt))
+            pps = _bot_turn(state_box, game, dt)
+        effects.particles.update(dt)
+        effects.shake.update(S.SHAKE_DECAY)
+        _draw_game(ui, screen, effects, game, t, high_score, shake)
+        ui.draw_bot_hud(pps)
+
     pygame.display.flip()
 
     state_box["state"] = state
@@ -221,6 +571,8 @@ def main_desktop():
         "game": None,
         "high_score": high_score,
         "t0": time.time(),
+        "replay": _load_replay(),
+        "suspended": load_suspended() is not None,
     }
 
     running = True
@@ -228,9 +580,15 @@ def main_desktop():
         running = _run_frame(clock, screen, ui, effects, state_box)
 
     # Save on exit
-    if state_box["game"] is not None:
-        hs = max(state_box["high_score"], state_box["game"].score)
+    if state_box["game"] is not None and state_box["state"] == "play":
+        hs = max(state_box["high_score"], _ranked_score(state_box, state_box["game"]))
         save_high_score(hs)
+        _finish_run(state_box)
+        _suspend(state_box, state_box["game"])
+    if state_box.get("worker") is not None:
+        state_box["worker"].close()
+    if state_box.get("pc_solver") is not None:
+        state_box["pc_solver"].cache.save()
 
     pygame.quit()
 
@@ -253,6 +611,8 @@ async def main_web():
         "game": None,
         "high_score": high_score,
         "t0": time.time(),
+        "replay": _load_replay(),
+        "suspended": load_suspended() is not None,
     }
 
     running = True
@@ -261,9 +621,15 @@ async def main_web():
         # IMPORTANT: yield to browser event loop
         await asyncio.sleep(0)
 
-    if state_box["game"] is not None:
-        hs = max(state_box["high_score"], state_box["game"].score)
+    if state_box["game"] is not None and state_box["state"] == "play":
+        hs = max(state_box["high_score"], _ranked_score(state_box, state_box["game"]))
         save_high_score(hs)
+        _finish_run(state_box)
+        _suspend(state_box, state_box["game"])
+    if state_box.get("worker") is not None:
+        state_box["worker"].close()
+    if state_box.get("pc_solver") is not None:
+        state_box["pc_solver"].cache.save()
 
     pygame.quit()
 
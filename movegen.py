@@ -0,0 +1,142 @@
+# movegen.py
+from collections import deque
+from functools import lru_cache
+from typing import NamedTuple
+
+from pieces import SHAPE_TABLE
+from tetris import get_kicks
+
+# Inputs a path is made of; "down" is a soft drop to the floor (no gravity is
+# modelled: the piece can hover while it's being steered), "hard" ends a path.
+MOVES = ("left", "right", "cw", "ccw", "down")
+
+# Headroom above the board for kicked / spawning pieces in the collision bitsets
+_TOP = 8
+
+
+class Placement(NamedTuple):
+    kind: str
+    rot: int
+    x: int
+    y: int        # resting position (what Game.cur holds right before it locks)
+    path: tuple   # shortest input sequence from the start, ending in "hard"
+
+    def rows(self):
+        """((y, bits), ...) the piece occupies once locked."""
+        return tuple((self.y + dy, bits) for dy, bits in SHAPE_TABLE[self.kind][self.rot].shifted[self.x])
+
+
+def placements(game, kind=None, start=None):
+    """Every distinct resting placement of `kind` (default: the current piece)
+    reachable from `start` = (x, y, rot) (default: where the current piece is).
+    Placements that cover the same cells are reported once, with the
+    shortest path. Memoized on (board, kind, start)."""
+    if kind is None:
+        kind = game.cur.kind
+    if start is None:
+        c = game.cur
+        start = (c.x, c.y, c.rot) if c.kind == kind else (3, 0, 0)
+    return _search(tuple(game.masks), kind, start)
+
+
+def placements_on(masks, kind, start=(3, 0, 0)):
+    """Same as placements() for a bare board (row masks), e.g. in lookahead."""
+    return _search(tuple(masks), kind, start)
+
+
+@lru_cache(maxsize=1 << 15)
+def _search(masks, kind, start):
+    table = SHAPE_TABLE[kind]
+    h = len(masks)
+    occ = {}
+    coll = {}
+
+    def blocked(x, rot):
+        # Bit (y + _TOP) set == the piece collides at y, for every y at once
+        c = coll.get((x, rot))
+        if c is None:
+            shape = table[rot]
+            rows = shape.shifted.get(x)
+            if rows is None:
+                c = -1
+            else:
+                c = -1 << (h - shape.bottom + _TOP)     # floor
+                for dy, bits in rows:
+                    o = occ.get(bits)
+                    if o is None:
+                        o = occ[bits] = sum(1 << r for r, m in enumerate(masks) if m & bits)
+                    c |= (o << _TOP) >> dy
+            coll[(x, rot)] = c
+        return c
+
+    def floor(x, y, rot):
+        below = blocked(x, rot) >> (y + _TOP + 1)
+        return y + (below & -below).bit_length() - 1
+
+    # Per rotation: (input, target rotation, kick tests)
+    turns = [[] if kind == "O" else
+             [(name, (rot + d) % 4, get_kicks(kind, rot, (rot + d) % 4)) for name, d in (("cw", 1), ("ccw", -1))]
+             for rot in range(4)]
+    # A start that collides (spawn area blocked) can't be played at all
+    if blocked(start[0], start[2]) >> (start[1] + _TOP) & 1:
+        return ()
+    seen = {start: ()}
+    frontier = deque([start])
+    found = {}
+    landed = set()
+
+    def visit(name, s, path):
+        if s not in seen:
+            seen[s] = path + (name,)
+            frontier.append(s)
+
+    # BFS pops states in order of path length, so the first state that drops
+    # onto a given set of cells has the shortest path to it
+    while frontier:
+        state = frontier.popleft()
+        x, y, rot = state
+        path = seen[state]
+        ly = floor(x, y, rot)
+        if (x, ly, rot) not in landed:
+            landed.add((x, ly, rot))
+            cells = tuple((ly + dy, bits) for dy, bits in table[rot].shifted[x])
+            if cells not in found:
+                found[cells] = Placement(kind, rot, x, ly, path + ("hard",))
+
+        bit = 1 << (y + _TOP)
+        if not blocked(x - 1, rot) & bit:
+            visit("left", (x - 1, y, rot), path)
+        if not blocked(x + 1, rot) & bit:
+            visit("right", (x + 1, y, rot), path)
+        for name, nr, kicks in turns[rot]:
+            for ox, oy in kicks:
+                if not blocked(x + ox, nr) >> (y + oy + _TOP) & 1:
+                    visit(name, (x + ox, y + oy, nr), path)
+                    break
+        if ly > y:
+            visit("down", (x, ly, rot), path)
+    return tuple(found.values())
+
+
+cache_info = _search.cache_info
+cache_clear = _search.cache_clear
+
+
+def play(game, path):
+    """Feed a placement path to a Game through the player-facing calls."""
+    for name in path:
+        if name == "left":
+            game.move(-1)
+        elif name == "right":
+            game.move(+1)
+        elif name == "cw":
+            game.rotate(+1)
+        elif name == "ccw":
+            game.rotate(-1)
+        elif name == "down":
+            while game.step_down():
+                pass
+        elif name == "hard":
+            game.hard_drop()
+        elif name == "hold":
+            game.hold()
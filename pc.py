@@ -0,0 +1,279 @@
+# pc.py
+import os
+import sys
+import json
+import time
+from itertools import combinations
+from pathlib import Path
+
+import movegen
+from settings import S
+from pieces import SHAPE_TABLE
+from tetris import Game
+from bot import apply_placement
+
+CACHE_VERSION = 1
+CACHE_PATH = Path(__file__).with_name("pc_cache.json")
+
+_H = S.ROWS + S.HIDDEN_ROWS
+_W = S.COLS
+_FULL = (1 << _W) - 1
+
+# Bit sets over the bottom h rows, row r of the area at bits r*W .. r*W+W-1
+_AREA = [(1 << h * _W) - 1 for h in range(_H + 1)]
+_COL0 = [sum(1 << r * _W for r in range(h)) for h in range(_H + 1)]
+_EVEN = [sum(m << x for x in range(0, _W, 2)) for m in _COL0]
+
+# How far one piece can tip the even / odd column balance: T, L and J cover
+# 3 + 1 cells in some orientations, a vertical I 4 + 0; S, Z and O always 2 + 2.
+# Line clears remove 5 + 5, so the balance carries over them.
+_SLACK = {"T": 2, "L": 2, "J": 2, "I": 4, "S": 0, "Z": 0, "O": 0}
+
+
+class _GiveUp(Exception):
+    pass
+
+
+def _board_key(masks, h):
+    return "/".join(f"{m:x}" for m in masks[-h:])
+
+
+def _order(kinds, seq, hold, can_hold):
+    """Hold flags that play `kinds` in order from `seq` + hold, or None."""
+    def walk(i, hold, j, can_hold):
+        if j == len(kinds):
+            return []
+        if i >= len(seq):
+            return None
+        if seq[i] == kinds[j]:
+            rest = walk(i + 1, hold, j + 1, True)
+            if rest is not None:
+                return [False] + rest
+        if can_hold:
+            if hold is None:
+                if i + 1 < len(seq) and seq[i + 1] == kinds[j]:
+                    rest = walk(i + 2, seq[i], j + 1, True)
+                    if rest is not None:
+                        return [True] + rest
+            elif hold == kinds[j] and hold != seq[i]:
+                rest = walk(i + 1, seq[i], j + 1, True)
+                if rest is not None:
+                    return [True] + rest
+        return None
+    return walk(0, hold, 0, can_hold)
+
+
+class PCCache:
+    """Solved sub-boards, "<area rows>:<sorted kinds>" -> the placements
+    ([kind, rot, x, y - floor] in play order) that clear them, kept in a
+    JSON file.
+    path=None keeps it in memory only."""
+
+    def __init__(self, path=CACHE_PATH, max_entries=1 << 16):
+        self.path = path
+        self.max_entries = max_entries
+        self.data = {}
+        self.dirty = False
+        if path is not None:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    d = json.load(f)
+                if d.get("version") == CACHE_VERSION and d.get("cols") == _W:
+                    self.data = d["entries"]
+            except (OSError, ValueError):
+                pass
+
+    def __len__(self):
+        return len(self.data)
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def put(self, key, value):
+        if key in self.data:
+            return
+        self.data[key] = value
+        self.dirty = True
+        while len(self.data) > self.max_entries:
+            del self.data[next(iter(self.data))]   # oldest first
+
+    def save(self):
+        if self.path is None or not self.dirty:
+            return
+        tmp = str(self.path) + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": CACHE_VERSION, "cols": _W, "entries": self.data}, f)
+            os.replace(tmp, self.path)
+            self.dirty = False
+        except OSError:
+            pass   # read-only install / web
+
+
+class PCSolver:
+    """Depth-first search for a perfect clear with the known pieces (current,
+    preview and hold). A node is dropped when its empty cells can't be
+    covered: a count that isn't 4 per remaining piece, or an even / odd
+    column imbalance the remaining pieces can't make up. (Empty regions
+    aren't checked for sizes in multiples of 4: a clear part-way lets
+    regions join, so that rule would drop boards that have a PC.) Solved
+    sub-boards go to the cache, so repeated setups are looked up instead
+    of searched."""
+
+    def __init__(self, cache=None, max_height=4, max_nodes=200_000):
+        self.cache = cache if cache is not None else PCCache(None)
+        self.max_height = max_height
+        self.max_nodes = max_nodes
+        self.nodes = 0
+        self._failed = set()
+
+    def _prunable(self, masks, h, avail):
+        area = 0
+        for r, m in enumerate(masks[-h:]):
+            area |= m << r * _W
+        empty = ~area & _AREA[h]
+        n = empty.bit_count()
+        if n % 4 or n > 4 * len(avail):
+            return True
+        return abs(2 * (empty & _EVEN[h]).bit_count() - n) > sum(_SLACK[k] for k in avail)
+
+    def _dfs(self, masks, h, seq, i, hold, can_hold):
+        # Generator: yields None now and then, returns [(hold, Placement), ...] or None
+        if h == 0:
+            return []
+        if i >= len(seq):
+            return None
+        key = (masks[-h:], i, hold, can_hold)
+        if key in self._failed:
+            return None
+        self.nodes += 1
+        if self.nodes > self.max_nodes:
+            raise _GiveUp
+        if self.nodes % 256 == 0:
+            yield None
+        avail = seq[i:] + ((hold,) if hold else ())
+        if self._prunable(masks, h, avail):
+            self._failed.add(key)
+            return None
+
+        options = [(False, seq[i], i + 1, hold)]
+        if can_hold:
+            if hold is None:
+                if i + 1 < len(seq):
+                    options.append((True, seq[i + 1], i + 2, seq[i]))
+            elif hold != seq[i]:
+                options.append((True, hold, i + 1, seq[i]))
+        top = len(masks) - h
+        for held, kind, ni, nhold in options:
+            # Lowest placements first: they're the ones that fill rows
+            for p in sorted(movegen.placements_on(masks, kind), key=lambda p: -p.y):
+                if any(y < top for y, _ in p.rows()):
+                    continue
+                after, lines = apply_placement(masks, p, _FULL)
+                rest = yield from self._dfs(tuple(after), h - lines, seq, ni, nhold, True)
+                if rest is not None:
+                    sol = [(held, p)] + rest
+                    kinds = "".join(sorted(q.kind for _, q in sol))
+                    # y counted from the floor: sub-boards recur at other board heights
+                    self.cache.put(f"{_board_key(masks, h)}:{kinds}",
+                                   [[q.kind, q.rot, q.x, q.y - len(masks)] for _, q in sol])
+                    return sol
+        self._failed.add(key)
+        return None
+
+    def _lookup(self, masks, h, seq, hold, can_hold, n):
+        board = _board_key(masks, h)
+        avail = sorted(seq + ((hold,) if hold else ()))
+        for combo in sorted(set(combinations(avail, n))):
+            stored = self.cache.get(f"{board}:{''.join(combo)}")
+            if stored is None:
+                continue
+            flags = _order([s[0] for s in stored], seq, hold, can_hold)
+            if flags is None:
+                continue
+            # Rebuild through movegen: checks each placement is still reachable
+            steps, cur = [], masks
+            for (kind, rot, x, y), held in zip(stored, flags):
+                want = movegen.Placement(kind, rot, x, y + len(masks), ()).rows()
+                p = next((p for p in movegen.placements_on(cur, kind) if p.rows() == want), None)
+                if p is None:
+                    break
+                steps.append((held, p))
+                cur = tuple(apply_placement(cur, p, _FULL)[0])
+            else:
+                return steps
+        return None
+
+    def search(self, masks, pieces, hold=None, can_hold=True):
+        """Generator: yields None while searching (so a caller can spread it
+        over frames), then once the solution: [(hold first?, Placement), ...],
+        or [] when there's none within max_height / max_nodes."""
+        masks, seq = tuple(masks), tuple(pieces)
+        filled = sum(m.bit_count() for m in masks)
+        top = next((_H - y for y, m in enumerate(masks) if m), 0)
+        avail = len(seq) + (hold is not None)
+        heights = [h for h in range(max(top, 1), min(self.max_height, _H - 4) + 1)
+                   if h * _W > filled and (h * _W - filled) % 4 == 0
+                   and (h * _W - filled) // 4 <= avail]
+        # Placements are generated on the PC area plus 4 empty rows for the
+        # spawn: the rows above are empty anyway, and movegen's search is
+        # that much smaller (and its memo shared across games)
+        off = {h: _H - h - 4 for h in heights}
+        for h in heights:
+            hit = self._lookup(masks[off[h]:], h, seq, hold, can_hold, (h * _W - filled) // 4)
+            if hit:
+                yield [(held, p._replace(y=p.y + off[h])) for held, p in hit]
+                return
+        self.nodes = 0
+        for h in heights:
+            self._failed = set()
+            try:
+                sol = yield from self._dfs(masks[off[h]:], h, seq, 0, hold, can_hold)
+            except _GiveUp:
+                break
+            finally:
+                self._failed = set()
+            if sol:
+                yield [(held, p._replace(y=p.y + off[h])) for held, p in sol]
+                return
+        yield []
+
+    def search_game(self, game):
+        return self.search(game.masks, [game.cur.kind] + list(game.queue),
+                           game.hold_kind, not game.hold_used)
+
+    def solve(self, masks, pieces, hold=None, can_hold=True):
+        for res in self.search(masks, pieces, hold, can_hold):
+            if res is not None:
+                return res
+
+
+def overlay(masks, steps):
+    """(kind, hold first?, cells) per step, with the cells in the board's
+    current row numbering (later pieces land lower once rows clear)."""
+    rowmap = list(range(_H))
+    masks = list(masks)
+    out = []
+    for held, p in steps:
+        cells = [(p.x + bx, rowmap[p.y + by]) for bx, by in SHAPE_TABLE[p.kind][p.rot].blocks]
+        out.append((p.kind, held, cells))
+        for y, bits in p.rows():
+            masks[y] |= bits
+        full = {y for y, m in enumerate(masks) if m == _FULL}
+        masks = [0] * len(full) + [m for y, m in enumerate(masks) if y not in full]
+        rowmap = [None] * len(full) + [r for y, r in enumerate(rowmap) if y not in full]
+    return out
+
+
+if __name__ == "__main__":
+    # Opening PCs for a few seeds, searched and then again from the cache
+    solver = PCSolver(PCCache())
+    for seed in (int(a) for a in sys.argv[1:] or range(5)):
+        game = Game(seed=seed)
+        for label in ("search", "cache"):
+            t0 = time.perf_counter()
+            steps = solver.solve(game.masks, [game.cur.kind] + list(game.queue), game.hold_kind)
+            ms = (time.perf_counter() - t0) * 1000.0
+            moves = " ".join(("h:" if held else "") + f"{p.kind}{p.rot}@{p.x}" for held, p in steps)
+            print(f"seed {seed} {label:6s} {ms:9.3f}ms  {moves or 'no PC'}  ({solver.nodes} nodes)")
+    solver.cache.save()
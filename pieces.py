@@ -1,5 +1,6 @@
 # pieces.py
 import random
+from dataclasses import dataclass
 from settings import S
 
 PIECES = ["I", "O", "T", "S", "Z", "J", "L"]
@@ -28,6 +29,13 @@ def shape_to_blocks(shape_rows):
                 blocks.append((x, y))
     return blocks
 
+def blocks_to_row_masks(blocks):
+    # (dy, bits) per occupied shape row; bit x == column x
+    rows = {}
+    for x, y in blocks:
+        rows[y] = rows.get(y, 0) | (1 << x)
+    return tuple(sorted(rows.items()))
+
 ROTATIONS = {}
 for k, base in SHAPES.items():
     rots = [base]
@@ -38,6 +46,36 @@ for k, base in SHAPES.items():
 # O-piece should not "wiggle"
 ROTATIONS["O"] = [ROTATIONS["O"][0]] * 4
 
+
+@dataclass(frozen=True)
+class Shape:
+    """Precomputed geometry of one (kind, rotation)."""
+    blocks: tuple    # ((x, y), ...) inside the 4x4 box
+    rows: tuple      # ((dy, bits), ...) unshifted row masks
+    left: int        # bounding box (inclusive)
+    right: int
+    top: int
+    bottom: int
+    bottoms: tuple   # ((dx, lowest dy), ...) per occupied column
+    shifted: dict    # px -> ((dy, bits << px), ...) for every in-bounds px
+
+def make_shape(blocks, cols=S.COLS):
+    blocks = tuple(blocks)
+    rows = blocks_to_row_masks(blocks)
+    xs = [x for x, _ in blocks]
+    ys = [y for _, y in blocks]
+    left, right = min(xs), max(xs)
+    low = {}
+    for x, y in blocks:
+        low[x] = max(low.get(x, y), y)
+    shifted = {}
+    for px in range(-left, cols - right):
+        shifted[px] = tuple((dy, bits << px if px >= 0 else bits >> -px) for dy, bits in rows)
+    return Shape(blocks, rows, left, right, min(ys), max(ys), tuple(sorted(low.items())), shifted)
+
+# SHAPE_TABLE[kind][rot] -> Shape
+SHAPE_TABLE = {k: [make_shape(b) for b in rots] for k, rots in ROTATIONS.items()}
+
 class Bag:
     def __init__(self, seed=None):
         self.rng = random.Random(seed)
@@ -48,3 +86,107 @@ class Bag:
             self._bag = PIECES[:]
             self.rng.shuffle(self._bag)
         return self._bag.pop()
+
+
+# --- Seekable piece sequence ---
+_M64 = (1 << 64) - 1
+
+
+def mix(*vals):
+    """splitmix64 over the values: a stateless 64-bit hash of (seed, index, ...)."""
+    h = 0
+    for v in vals:
+        h = ((h ^ (v & _M64)) + 0x9E3779B97F4A7C15) & _M64
+        z = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & _M64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _M64
+        h = z ^ (z >> 31)
+    return h
+
+
+def _shuffled(seed, b, pool):
+    order = list(pool)
+    random.Random(mix(seed, b)).shuffle(order)
+    return order
+
+
+class _Bag:
+    def __init__(self, copies):
+        self.size = 7 * copies
+        self.pool = PIECES * copies
+
+    def block(self, seq, b):
+        return _shuffled(seq.seed, b, self.pool)
+
+
+class _Memoryless:
+    size = 64
+
+    def block(self, seq, b):
+        return [PIECES[mix(seq.seed, b * self.size + i) % 7] for i in range(self.size)]
+
+
+class _History:
+    """TGM-style: reroll up to `tries` times while the piece is in the last 4.
+    The history carries across blocks, so block starts are checkpointed and a
+    cold seek replays at most one block per unseen checkpoint."""
+    size = 256
+
+    def __init__(self, tries=4):
+        self.tries = tries
+
+    def block(self, seq, b):
+        hist = seq._checkpoints
+        start = max(k for k in hist if k <= b)
+        for k in range(start, b + 1):
+            h = list(hist[k])
+            out = []
+            for i in range(self.size):
+                n = k * self.size + i
+                for r in range(self.tries):
+                    kind = PIECES[mix(seq.seed, n, r) % 7]
+                    # TGM never opens with S, Z or O
+                    if n == 0 and kind in "SZO":
+                        continue
+                    if kind not in h:
+                        break
+                if n == 0 and kind in "SZO":
+                    kind = "IJLT"[mix(seq.seed, n) % 4]
+                out.append(kind)
+                h = h[1:] + [kind]
+            hist[k + 1] = tuple(h)
+        return out
+
+
+RANDOMIZERS = {
+    "7bag": lambda: _Bag(1),
+    "14bag": lambda: _Bag(2),
+    "tgm": lambda: _History(4),
+    "memoryless": lambda: _Memoryless(),
+}
+
+
+class PieceSequence:
+    """Random-access piece stream: piece n derives from (seed, n // block size),
+    so any index is fetched without replaying the ones before it."""
+
+    def __init__(self, seed=None, randomizer="7bag"):
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self.randomizer = randomizer
+        self._gen = RANDOMIZERS[randomizer]()
+        self._checkpoints = {0: ("Z", "Z", "S", "S")}
+        self._blocks = {}
+
+    def _block(self, b):
+        blk = self._blocks.get(b)
+        if blk is None:
+            if len(self._blocks) >= 8:
+                self._blocks.clear()
+            blk = self._blocks[b] = self._gen.block(self, b)
+        return blk
+
+    def __getitem__(self, n):
+        size = self._gen.size
+        return self._block(n // size)[n % size]
+
+    def window(self, start, depth):
+        return [self[n] for n in range(start, start + depth)]
@@ -5,6 +5,8 @@ from pathlib import Path
 
 IS_WEB = (sys.platform == "emscripten")
 HIGH_SCORE_PATH = Path(__file__).with_name("highscore.json")
+REPLAY_PATH = Path(__file__).with_name("last_replay.trp")
+SUSPEND_PATH = Path(__file__).with_name("suspend.bin")
 
 
 def load_high_score() -> int:
@@ -42,3 +44,82 @@ def save_high_score(score: int) -> None:
         HIGH_SCORE_PATH.write_text(json.dumps({"high_score": score}, indent=2), encoding="utf-8")
     except Exception:
         pass
+
+
+def load_last_replay():
+    """Last finished run as a replay container source: a Path on desktop
+    (memory-mapped by the reader), bytes on web. None if there is none."""
+    if IS_WEB:
+        try:
+            import js
+            import base64
+            v = js.window.localStorage.getItem("tetris_last_replay")
+            return base64.b64decode(v) if v else None
+        except Exception:
+            return None
+
+    return REPLAY_PATH if REPLAY_PATH.is_file() else None
+
+
+def save_last_replay(data: bytes) -> None:
+    if IS_WEB:
+        try:
+            import js
+            import base64
+            js.window.localStorage.setItem("tetris_last_replay", base64.b64encode(data).decode("ascii"))
+        except Exception:
+            pass
+        return
+
+    try:
+        REPLAY_PATH.write_bytes(data)
+    except Exception:
+        pass
+
+
+def load_suspended():
+    """Blob of a suspended in-progress game, or None."""
+    if IS_WEB:
+        try:
+            import js
+            import base64
+            v = js.window.localStorage.getItem("tetris_suspend")
+            return base64.b64decode(v) if v else None
+        except Exception:
+            return None
+
+    try:
+        return SUSPEND_PATH.read_bytes()
+    except Exception:
+        return None
+
+
+def save_suspended(data: bytes) -> None:
+    if IS_WEB:
+        try:
+            import js
+            import base64
+            js.window.localStorage.setItem("tetris_suspend", base64.b64encode(data).decode("ascii"))
+        except Exception:
+            pass
+        return
+
+    try:
+        SUSPEND_PATH.write_bytes(data)
+    except Exception:
+        pass
+
+
+def clear_suspended() -> None:
+    if IS_WEB:
+        try:
+            import js
+            js.window.localStorage.removeItem("tetris_suspend")
+        except Exception:
+            pass
+        return
+
+    try:
+        SUSPEND_PATH.unlink()
+    except Exception:
+        pass
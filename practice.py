@@ -0,0 +1,126 @@
+# practice.py
+import sys
+import struct
+from collections import deque
+
+from settings import S
+from tetris import Piece, KIND_CODE, CODE_KIND, COLOR_CODE, CODE_COLOR
+
+# Per-lock delta: pre-piece scalars + the cells the lock wrote, and (once the
+# clear animation ends) the rows it removed. Undoing replays these backwards.
+_HEAD = struct.Struct("<BBBIIHIB")  # kind, hold, hold_used, score, lines, level, piece_index, ncells
+_ROW = struct.Struct("<BH")         # y, mask (+ one color code per column)
+
+
+class Rewind:
+    """Game observer keeping per-lock deltas in a ring buffer capped at
+    `max_bytes`; the oldest deltas are dropped first."""
+
+    def __init__(self, max_bytes=S.REWIND_MEMORY):
+        self.max_bytes = max_bytes
+        self.items = deque()
+        self.used = 0
+        self.score = 0      # at the current piece's spawn, before its drop points
+
+    def __len__(self):
+        return len(self.items)
+
+    def attach(self, game):
+        game.observers.append(self)
+        self.score = game.score
+        return self
+
+    def _push(self, entry):
+        self.items.append(entry)
+        self.used += sys.getsizeof(entry)
+        while self.used > self.max_bytes and self.items:
+            self.used -= sys.getsizeof(self.items.popleft())
+
+    def on_reset(self, game):
+        self.items.clear()
+        self.used = 0
+        self.score = 0
+
+    def on_spawn(self, game):
+        self.score = game.score
+
+    def on_lock(self, game):
+        p = game.cur
+        h = len(game.masks)
+        cells = [(p.x + bx, p.y + by) for bx, by in p.shape().blocks if 0 <= p.y + by < h]
+        head = _HEAD.pack(
+            KIND_CODE[p.kind], KIND_CODE.get(game.hold_kind, 0), game.hold_used,
+            self.score, game.lines, game.level, game.piece_index, len(cells),
+        )
+        self._push(head + bytes(v for c in cells for v in c))
+
+    def on_clear(self, game, rows):
+        if not self.items:
+            return
+        last = self.items.pop()
+        self.used -= sys.getsizeof(last)
+        parts = [last, bytes((len(rows),))]
+        for y in sorted(rows):
+            parts.append(_ROW.pack(y, game.masks[y]))
+            parts.append(bytes(COLOR_CODE.get(c, 0) for c in game.grid[y]))
+        self._push(b"".join(parts))
+
+    def rewind(self, game, n=1):
+        """Undo up to `n` locks; returns how many were undone."""
+        done = 0
+        while done < n and self.items:
+            entry = self.items.pop()
+            self.used -= sys.getsizeof(entry)
+            self._undo(game, entry)
+            done += 1
+        if done:
+            game._recalc_col_top()
+            game._recalc_gravity()
+        return done
+
+    def _undo(self, game, entry):
+        kind, hold, hold_used, score, lines, level, index, ncells = _HEAD.unpack_from(entry)
+        off = _HEAD.size
+        cells = entry[off:off + 2 * ncells]
+        off += 2 * ncells
+
+        # Rows removed after this lock: splice them back where they were
+        if off < len(entry):
+            count = entry[off]
+            off += 1
+            saved = {}
+            for _ in range(count):
+                y, mask = _ROW.unpack_from(entry, off)
+                off += _ROW.size
+                saved[y] = (mask, [CODE_COLOR.get(c) for c in entry[off:off + game.cols]])
+                off += game.cols
+            keep = iter(range(count, len(game.masks)))
+            grid, masks = [], []
+            for y in range(len(game.masks)):
+                if y in saved:
+                    m, row = saved[y]
+                else:
+                    k = next(keep)
+                    m, row = game.masks[k], game.grid[k]
+                masks.append(m)
+                grid.append(row)
+            game.grid, game.masks = grid, masks
+
+        for i in range(0, len(cells), 2):
+            x, y = cells[i], cells[i + 1]
+            game.grid[y][x] = None
+            game.masks[y] &= ~(1 << x)
+
+        game.score, game.lines, game.level = score, lines, level
+        self.score = score
+        game.hold_kind = CODE_KIND.get(hold)
+        game.hold_used = bool(hold_used)
+        game.piece_index = index
+        game.queue = game.preview()
+        game.cur = Piece(CODE_KIND[kind], 3, 0)
+        game.dead = False
+        game.clear_anim_t = 0
+        game.clearing_rows = []
+        game.pending_clear_rows = []
+        game.drop_acc = 0
+        game.lock_timer = 0
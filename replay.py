@@ -0,0 +1,320 @@
+# replay.py
+import sys
+import json
+import mmap
+import time
+import zlib
+import base64
+import struct
+import bisect
+from pathlib import Path
+
+from settings import S
+from tetris import Game, IN_HELD
+
+
+def state_checksum(game):
+    """CRC32 over the simulation state that a replay must reproduce."""
+    cur = game.cur
+    head = struct.pack(
+        "<IIIIbbbB?",
+        game.tick, game.score, game.lines, game.level,
+        cur.x, cur.y, cur.rot, ord(cur.kind), game.dead,
+    )
+    rows = struct.pack("<%dH" % len(game.masks), *game.masks)
+    return zlib.crc32(rows, zlib.crc32(head))
+
+
+class Replay:
+    """Legacy JSON replay (seed + one IN_* byte per tick), from before the
+    binary container: only read, through loads() / open_replay, so old
+    recordings still play and verify."""
+
+    def __init__(self, seed, inputs=b"", clear_anim=True, score=0, checksum=0, randomizer="7bag"):
+        self.seed = seed
+        self.randomizer = randomizer
+        self.inputs = bytearray(inputs)
+        self.clear_anim = clear_anim
+        self.score = score
+        self.checksum = checksum
+
+    @property
+    def ticks(self):
+        return len(self.inputs)
+
+    def new_game(self, effects=None):
+        return Game(effects=effects, seed=self.seed, fixed_tick=True, clear_anim=self.clear_anim,
+                    randomizer=self.randomizer)
+
+    def runs(self, start=0):
+        return _runs(self.inputs, start)
+
+    def game_at(self, tick):
+        game = self.new_game()
+        _feed(game, self.runs(), tick)
+        return game
+
+    @classmethod
+    def loads(cls, text):
+        data = json.loads(text)
+        inputs = zlib.decompress(base64.b64decode(data["inputs"]))
+        return cls(
+            data["seed"], inputs,
+            clear_anim=data.get("clear_anim", True),
+            score=data.get("score", 0),
+            checksum=data.get("checksum", 0),
+            randomizer=data.get("randomizer", "7bag"),
+        )
+
+
+class Player:
+    """Feeds a Replay or ReplayReader back into a game: tick by tick, all at
+    once, or from any tick via seek()."""
+
+    def __init__(self, source, effects=None):
+        self.source = source
+        self.effects = effects
+        self.seek(0)
+
+    @property
+    def done(self):
+        return self.pos >= self.source.ticks
+
+    def seek(self, tick):
+        tick = max(0, min(tick, self.source.ticks))
+        self.game = self.source.game_at(tick)
+        self.game.effects = self.effects
+        self.pos = tick
+        self._runs = self.source.runs(tick)
+        self._run = None
+
+    def advance(self, ticks=1):
+        while ticks > 0:
+            if self._run is None:
+                self._run = next(self._runs, None)
+                if self._run is None:
+                    return
+            v, left = self._run
+            n = min(ticks, left)
+            self.game.step(v, n)
+            self.pos += n
+            ticks -= n
+            self._run = None if n == left else (v & IN_HELD, left - n)
+
+    def run(self):
+        """Re-simulate to the end at full speed; returns the final checksum."""
+        self.advance(self.source.ticks - self.pos)
+        return state_checksum(self.game)
+
+
+def _runs(data, start=0):
+    """(inputs, count) runs over per-tick bytes; edge bits only fire on a run of one."""
+    i, n = start, len(data)
+    while i < n:
+        v = data[i]
+        j = i + 1
+        if v == (v & IN_HELD):
+            while j < n and data[j] == v:
+                j += 1
+        yield v, j - i
+        i = j
+
+
+def _feed(game, runs, ticks):
+    for v, n in runs:
+        if ticks <= 0:
+            break
+        n = min(n, ticks)
+        game.step(v, n)
+        ticks -= n
+
+
+# --- Binary container ---
+#
+#   header   MAGIC, version, seed, keyframe interval (ticks)
+#   blocks   one per interval: u32 len + zlib(keyframe state at block start),
+#            u32 len + zlib(RLE inputs for the block's ticks)
+#   index    u32 count, (u32 start tick, u64 block offset) * count
+#   footer   u64 index offset, u32 ticks, u32 score, u32 checksum, END
+#
+# Readers only touch the footer, the index and the blocks they need.
+
+MAGIC = b"TRPB"
+END = b"TRPE"
+CONTAINER_VERSION = 2
+KEYFRAME_TICKS = S.TICK_RATE * 10
+
+_HEAD = struct.Struct("<4sBQI")
+_FOOT = struct.Struct("<QIII4s")
+_ENTRY = struct.Struct("<IQ")
+_LEN = struct.Struct("<I")
+
+
+def _rle(data):
+    out = bytearray()
+    i, n = 0, len(data)
+    while i < n:
+        v = data[i]
+        j = i + 1
+        while j < n and data[j] == v:
+            j += 1
+        out.append(v)
+        run = j - i
+        while run >= 0x80:
+            out.append((run & 0x7F) | 0x80)
+            run >>= 7
+        out.append(run)
+        i = j
+    return bytes(out)
+
+
+def _unrle(data):
+    out = bytearray()
+    i, n = 0, len(data)
+    while i < n:
+        v = data[i]
+        i += 1
+        run, shift = 0, 0
+        while True:
+            b = data[i]
+            i += 1
+            run |= (b & 0x7F) << shift
+            shift += 7
+            if b < 0x80:
+                break
+        out.extend(bytes((v,)) * run)
+    return out
+
+
+class ReplayWriter:
+    """Streams a fixed-tick game into the container as it is played."""
+
+    def __init__(self, f, game, keyframe_every=KEYFRAME_TICKS):
+        self.f = f
+        self.game = game
+        self.every = keyframe_every
+        self.index = []
+        self.block = bytearray()
+        self.ticks = 0
+        self.key = game.dump_state()
+        f.write(_HEAD.pack(MAGIC, CONTAINER_VERSION, game.seq.seed & 0xFFFFFFFFFFFFFFFF, keyframe_every))
+
+    def step(self, inputs, ticks=1):
+        g = self.game
+        if g.dead or g.paused:
+            return
+        while ticks > 0:
+            n = min(ticks, self.every - len(self.block))
+            g.step(inputs, n)
+            self.block.append(inputs)
+            self.block.extend(bytes((inputs & IN_HELD,)) * (n - 1))
+            self.ticks += n
+            ticks -= n
+            inputs &= IN_HELD
+            if len(self.block) == self.every:
+                self._flush()
+
+    def _flush(self):
+        f = self.f
+        self.index.append((self.ticks - len(self.block), f.tell()))
+        for part in (self.key, _rle(self.block)):
+            z = zlib.compress(part, 6)
+            f.write(_LEN.pack(len(z)))
+            f.write(z)
+        self.block = bytearray()
+        self.key = self.game.dump_state()
+
+    def close(self):
+        if self.block:
+            self._flush()
+        f = self.f
+        at = f.tell()
+        f.write(_LEN.pack(len(self.index)))
+        for entry in self.index:
+            f.write(_ENTRY.pack(*entry))
+        f.write(_FOOT.pack(at, self.ticks, self.game.score, state_checksum(self.game), END))
+
+
+class ReplayReader:
+    """Random-access view of a container; `src` is a path, an open binary file
+    (both memory-mapped) or any bytes-like object."""
+
+    def __init__(self, src):
+        self._file = None
+        if isinstance(src, (str, Path)):
+            self._file = open(src, "rb")
+            src = self._file
+        if hasattr(src, "fileno"):
+            src = mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buf = src
+
+        magic, version, self.seed, self.every = _HEAD.unpack_from(src, 0)
+        if magic != MAGIC or version != CONTAINER_VERSION:
+            raise ValueError("not a replay container")
+        at, self.ticks, self.score, self.checksum, end = _FOOT.unpack_from(src, len(src) - _FOOT.size)
+        if end != END:
+            raise ValueError("truncated replay container")
+        (count,) = _LEN.unpack_from(src, at)
+        entries = [_ENTRY.unpack_from(src, at + 4 + i * _ENTRY.size) for i in range(count)]
+        self.starts = [t for t, _ in entries]
+        self.offsets = [o for _, o in entries]
+
+    def close(self):
+        if isinstance(self.buf, mmap.mmap):
+            self.buf.close()
+        if self._file is not None:
+            self._file.close()
+
+    def _part(self, off):
+        (n,) = _LEN.unpack_from(self.buf, off)
+        return zlib.decompress(self.buf[off + 4:off + 4 + n]), off + 4 + n
+
+    def block(self, k):
+        """(keyframe state, per-tick inputs) of block k."""
+        key, off = self._part(self.offsets[k])
+        inputs, _ = self._part(off)
+        return key, _unrle(inputs)
+
+    def _block_of(self, tick):
+        return max(0, bisect.bisect_right(self.starts, tick) - 1)
+
+    def runs(self, start=0):
+        for k in range(self._block_of(start), len(self.starts)):
+            _, inputs = self.block(k)
+            yield from _runs(inputs, max(0, start - self.starts[k]))
+
+    def game_at(self, tick):
+        """Engine state at `tick`: nearest keyframe, then at most one block of inputs."""
+        if not self.starts:
+            raise ValueError("empty replay container")
+        k = self._block_of(tick)
+        key, inputs = self.block(k)
+        game = Game.from_state(key)
+        _feed(game, _runs(inputs), tick - self.starts[k])
+        return game
+
+
+def verify(replay):
+    p = Player(replay)
+    return p.run() == replay.checksum and p.game.score == replay.score
+
+
+def open_replay(path):
+    """Replay (JSON) or ReplayReader (binary container) depending on the file."""
+    with open(path, "rb") as f:
+        magic = f.read(len(MAGIC))
+    if magic == MAGIC:
+        return ReplayReader(path)
+    return Replay.loads(Path(path).read_text(encoding="utf-8"))
+
+
+if __name__ == "__main__":
+    bad = 0
+    for arg in sys.argv[1:]:
+        r = open_replay(arg)
+        t0 = time.perf_counter()
+        ok = verify(r)
+        ms = (time.perf_counter() - t0) * 1000.0
+        bad += not ok
+        print(f"{'OK  ' if ok else 'FAIL'} {arg}  score={r.score} ticks={r.ticks} {ms:.1f}ms")
+    sys.exit(1 if bad else 0)
@@ -0,0 +1,240 @@
+# search.py
+import sys
+import time
+import random
+from collections import Counter, OrderedDict
+
+import movegen
+from settings import S
+from pieces import PIECES
+from tetris import Game
+from bot import Bot, apply_placement
+
+# Zobrist keys per (row, row mask); a board hashes to the XOR of its rows'
+# keys, so a placement that clears nothing updates the hash row by row
+_H = S.ROWS + S.HIDDEN_ROWS
+_rng = random.Random(0x5EED)
+ZOBRIST = [[0] + [_rng.getrandbits(64) for _ in range(1, 1 << S.COLS)] for _ in range(_H)]
+
+# Randomizers whose upcoming pieces are drawn from a bag (pool copies per bag)
+BAG_COPIES = {"7bag": 1, "14bag": 2}
+
+
+def board_hash(masks):
+    h = 0
+    for y, m in enumerate(masks):
+        if m:
+            h ^= ZOBRIST[y][m]
+    return h
+
+
+def bag_remainder(game):
+    """Pieces still to come in the bag of the last previewed piece, as a sorted
+    tuple, or None for randomizers without bags (unknown pieces then count as
+    uniformly random)."""
+    copies = BAG_COPIES.get(game.randomizer)
+    if copies is None:
+        return None
+    size = 7 * copies
+    last = game.piece_index + len(game.queue) - 1
+    start = last // size * size
+    left = Counter(PIECES * copies)
+    left.subtract(game.seq[i] for i in range(start, last + 1))
+    return tuple(sorted(left.elements()))
+
+
+class TranspositionTable:
+    """Bounded map with least-recently-used eviction and hit counters."""
+
+    def __init__(self, max_entries=1 << 18):
+        self.max_entries = max_entries
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    def get(self, key):
+        value = self.data.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.data[key] = value
+        self.data.move_to_end(key)
+        if len(self.data) > self.max_entries:
+            self.data.popitem(last=False)
+
+    def stats(self):
+        looked = self.hits + self.misses
+        size = sys.getsizeof(self.data)
+        for k, v in self.data.items():
+            size += sys.getsizeof(k) + sys.getsizeof(v)
+            if isinstance(k, tuple):
+                size += sum(sys.getsizeof(x) for x in k)
+        return {
+            "entries": len(self.data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / looked if looked else 0.0,
+            "bytes": size,
+        }
+
+
+class _Stop(Exception):
+    pass
+
+
+class Search:
+    """Expectimax over the preview queue: the known pieces (current, queue and
+    hold) are played out, pieces past the preview are averaged over what the
+    bag can still hold. At every node only the `width` placements with the
+    best immediate evaluation are searched deeper. Leaf evaluations and node
+    values are kept in a Zobrist-keyed transposition table shared across
+    moves."""
+
+    def __init__(self, bot=None, depth=3, width=6, tt_entries=1 << 18):
+        self.bot = bot or Bot()
+        self.depth = depth
+        self.width = width
+        self.tt = TranspositionTable(tt_entries)
+        self.full_mask = (1 << S.COLS) - 1
+        self.w_lines = self.bot.weights.get("lines", 0.0)
+        self.copies = 1
+        self.stop = lambda: False
+
+    def _leaf(self, masks, h):
+        v = self.tt.get(h)
+        if v is None:
+            v = self.bot.evaluate(masks, S.COLS)
+            self.tt.put(h, v)
+        return v
+
+    def _place(self, masks, h, p):
+        after, lines = apply_placement(masks, p, self.full_mask)
+        if lines:
+            nh = board_hash(after)
+        else:
+            nh = h
+            for y, _ in p.rows():
+                if y >= 0:
+                    nh ^= ZOBRIST[y][masks[y]] ^ ZOBRIST[y][after[y]]
+        return after, nh, lines
+
+    def _children(self, masks, h, options):
+        # (immediate value, masks, hash, lines, tag) of the `width` best placements
+        out = []
+        for tag, placements in options:
+            for p in placements:
+                after, nh, lines = self._place(masks, h, p)
+                out.append((self.w_lines * lines + self._leaf(after, nh), after, nh, lines, (tag, p)))
+        out.sort(key=lambda c: c[0], reverse=True)
+        return out[:self.width]
+
+    def _value(self, masks, h, hold, pieces, bag, depth):
+        if depth == 0:
+            return self._leaf(masks, h)
+        if self.stop():
+            raise _Stop
+        key = (h, depth, hold, pieces, bag)
+        v = self.tt.get(key)
+        if v is not None:
+            return v
+
+        if not pieces:
+            # Chance node: the next piece is any kind the bag still holds (a
+            # spent bag refills); without a bag, any of the seven
+            pool = None if bag is None else (bag or tuple(sorted(PIECES * self.copies)))
+            kinds = Counter(pool or PIECES)
+            total = sum(kinds.values())
+            v = 0.0
+            for k, n in kinds.items():
+                rest = None
+                if pool is not None:
+                    left = list(pool)
+                    left.remove(k)
+                    rest = tuple(left)
+                v += n / total * self._value(masks, h, hold, (k,), rest, depth)
+        else:
+            cur, rest = pieces[0], pieces[1:]
+            options = [((hold, rest), movegen.placements_on(masks, cur))]
+            if hold is None:
+                if rest:
+                    options.append(((cur, rest[1:]), movegen.placements_on(masks, rest[0])))
+            elif hold != cur:
+                options.append(((cur, rest), movegen.placements_on(masks, hold)))
+            v = None
+            for _, after, nh, lines, ((nhold, nrest), _) in self._children(masks, h, options):
+                cv = self.w_lines * lines + self._value(after, nh, nhold, nrest, bag, depth - 1)
+                if v is None or cv > v:
+                    v = cv
+        self.tt.put(key, v)
+        return v
+
+    def _root(self, game, depth):
+        pieces = tuple(game.queue)
+        bag = bag_remainder(game)
+        cur = game.cur.kind
+        self.copies = BAG_COPIES.get(game.randomizer, 1)
+        opts = [(((), game.hold_kind, pieces), movegen.placements(game))]
+        if not game.hold_used:
+            if game.hold_kind is None:
+                if pieces:
+                    opts.append(((("hold",), cur, pieces[1:]),
+                                 movegen.placements(game, kind=pieces[0], start=(3, 0, 0))))
+            elif game.hold_kind != cur:
+                opts.append(((("hold",), cur, pieces),
+                             movegen.placements(game, kind=game.hold_kind, start=(3, 0, 0))))
+        masks = list(game.masks)
+        h = board_hash(masks)
+        best, best_path = None, None
+        for _, after, nh, lines, ((prefix, nhold, nrest), p) in self._children(masks, h, opts):
+            v = self.w_lines * lines + self._value(after, nh, nhold, nrest, bag, depth - 1)
+            if best is None or v > best:
+                best, best_path = v, prefix + p.path
+        return best_path, best
+
+    def think(self, game, stop=lambda: False):
+        """Iterative deepening up to self.depth; yields the best input path
+        after each completed depth (Bot.think's contract, for BotWorker)."""
+        if game.dead or game.clear_anim_t > 0:
+            return
+        self.stop = stop
+        try:
+            for depth in range(1, self.depth + 1):
+                path, _ = self._root(game, depth)
+                if path is None:
+                    return
+                yield path
+        except _Stop:
+            return
+        finally:
+            self.stop = lambda: False
+
+    def best(self, game):
+        path = None
+        for path in self.think(game):
+            pass
+        return path
+
+
+if __name__ == "__main__":
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    pieces = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    search = Search(depth=depth)
+    game = Game(seed=1, clear_anim=False)
+    t0 = time.perf_counter()
+    n = 0
+    while n < pieces and not game.dead:
+        movegen.play(game, search.best(game))
+        n += 1
+    dt = time.perf_counter() - t0
+    st = search.tt.stats()
+    print(f"depth {depth}: {n} pieces, {game.lines} lines, {n / dt:.1f} PPS")
+    print(f"TT: {st['entries']} entries, {st['bytes'] / 1e6:.1f} MB, hit rate {st['hit_rate']:.1%}"
+          f" ({st['hits']} hits / {st['misses']} misses)")
@@ -0,0 +1,293 @@
+# server.py
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from collections import deque
+
+from settings import S
+from tetris import Game, IN_LEFT, IN_RIGHT, IN_CW, IN_CCW, IN_HARD, IN_HELD
+
+# JSON lines over TCP, one game session per connection.
+#
+# server -> client
+#   {"session": id, "seed": s, "tick": t, "tick_rate": S.TICK_RATE}
+#       on connect and restart; t is the game tick now
+#   {"tick": t, "piece": [kind, rot, x, y], "score", "lines", "dead"}
+#       whenever the piece, score or hold changes; after a new piece also
+#       "board" (hex row masks top to bottom, empty rows above omitted),
+#       "queue" and "hold"
+#   {"stats": {...}} / {"error": "..."}
+# client -> server
+#   {"t": tick, "in": bits}   input mask (tetris.IN_*) from game tick t on:
+#       LEFT / RIGHT / SOFT stay held until the next input, the rest fire
+#       once. Inputs for a tick already simulated apply at the next one.
+#   {"restart": seed or null}   {"stats": true}
+
+MAX_LINE = 4096
+MAX_INPUTS = 256            # buffered inputs per session
+MAX_BUFFER = 1 << 20        # unsent bytes before a client counts as stalled
+
+
+def _board(masks):
+    rows = list(masks)
+    while rows and not rows[0]:
+        rows.pop(0)
+    return "/".join(f"{m:x}" for m in rows)
+
+
+class Session:
+    def __init__(self, sid, conn, seed, start):
+        self.id = sid
+        self.conn = conn
+        self.inputs = deque()
+        self.restart(seed, start)
+
+    def restart(self, seed, start):
+        self.seed = random.getrandbits(32) if seed is None else seed
+        self.game = Game(seed=self.seed, fixed_tick=True)
+        self.start = start      # server tick of game tick 0
+        self.held = 0
+        self.inputs.clear()
+        self.sig = None
+        self.shape = None
+        self.conn.send({"session": self.id, "seed": self.seed, "tick": 0, "tick_rate": S.TICK_RATE})
+
+    def push(self, t, bits):
+        if len(self.inputs) >= MAX_INPUTS:
+            raise ValueError("too many pending inputs")
+        if self.inputs:
+            t = max(t, self.inputs[-1][0])     # stamped before a restart / reordered
+        self.inputs.append((t, bits))
+
+    def advance(self, target):
+        """Simulate up to game tick `target`, applying the inputs due by then."""
+        g = self.game
+        while self.inputs and self.inputs[0][0] < target and not g.dead:
+            t, bits = self.inputs.popleft()
+            if t > g.tick:
+                g.step(self.held, t - g.tick)
+            g.step(bits, 1)
+            self.held = bits & IN_HELD
+        if g.tick < target:
+            g.step(self.held, target - g.tick)
+        if g.dead:
+            self.inputs.clear()
+
+    def update(self):
+        g, c = self.game, self.game.cur
+        sig = (c.kind, c.rot, c.x, c.y, g.score, g.hold_kind, g.dead)
+        if sig == self.sig:
+            return
+        self.sig = sig
+        msg = {"tick": g.tick, "piece": [c.kind, c.rot, c.x, c.y],
+               "score": g.score, "lines": g.lines, "dead": g.dead}
+        shape = (g.piece_index, g.hold_kind)
+        if shape != self.shape:
+            self.shape = shape
+            msg.update(board=_board(g.masks), queue="".join(g.queue), hold=g.hold_kind)
+        self.conn.send(msg)
+
+
+class _Conn(asyncio.Protocol):
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+        self.session = None
+        self.buf = b""
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.session = self.server.open(self)
+
+    def data_received(self, data):
+        self.buf += data
+        *lines, self.buf = self.buf.split(b"\n")
+        if len(self.buf) > MAX_LINE:
+            self.send({"error": "line too long"})
+            self.transport.close()
+            return
+        for line in lines:
+            if line.strip():
+                self.server.handle(self.session, line)
+
+    def connection_lost(self, exc):
+        self.server.close(self.session)
+
+    def send(self, obj):
+        if self.transport.is_closing():
+            return
+        self.transport.write(json.dumps(obj, separators=(",", ":")).encode() + b"\n")
+        if self.transport.get_write_buffer_size() > MAX_BUFFER:
+            self.transport.abort()
+
+
+class Server:
+    """Every session advances from one scheduler task: each server tick
+    steps all games to their target game tick (S.TICK_RATE / rate per
+    server tick) and sends what changed. Connections only queue inputs."""
+
+    def __init__(self, rate=60, report=True):
+        self.rate = rate
+        self.report = report
+        self.sessions = {}
+        self.next_id = 1
+        self.tick = 0
+        self.late = 0
+        # (wall, cpu) ms of the last second of ticks; wall includes time the
+        # process was descheduled, cpu is this process only
+        self.tick_ms = deque(maxlen=rate)
+
+    def open(self, conn):
+        s = Session(self.next_id, conn, None, self.tick)
+        self.sessions[s.id] = s
+        self.next_id += 1
+        return s
+
+    def close(self, session):
+        self.sessions.pop(session.id, None)
+
+    def handle(self, session, line):
+        try:
+            msg = json.loads(line)
+            if "in" in msg:
+                session.push(int(msg["t"]), int(msg["in"]) & 0x7F)
+            elif "restart" in msg:
+                seed = msg["restart"]
+                session.restart(None if seed is None else int(seed), self.tick)
+            elif "stats" in msg:
+                session.conn.send({"stats": self.stats()})
+            else:
+                raise ValueError("unknown message")
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            session.conn.send({"error": str(e)})
+
+    def stats(self):
+        ms = self.tick_ms or [(0.0, 0.0)]
+        return {"sessions": len(self.sessions), "tick": self.tick, "rate": self.rate,
+                "avg_ms": round(sum(w for w, _ in ms) / len(ms), 3),
+                "max_ms": round(max(w for w, _ in ms), 3),
+                "cpu_ms": round(sum(c for _, c in ms) / len(ms), 3), "late": self.late}
+
+    def step(self):
+        t0, c0 = time.perf_counter(), time.process_time()
+        self.tick += 1
+        for s in list(self.sessions.values()):
+            s.advance((self.tick - s.start) * S.TICK_RATE // self.rate)
+            s.update()
+        self.tick_ms.append(((time.perf_counter() - t0) * 1000.0, (time.process_time() - c0) * 1000.0))
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        period = 1.0 / self.rate
+        due = loop.time()
+        while True:
+            self.step()
+            if self.report and self.tick % self.rate == 0:
+                st = self.stats()
+                print(f"{st['sessions']} sessions  tick {st['avg_ms']:.2f} ms avg "
+                      f"{st['max_ms']:.2f} max  cpu {st['cpu_ms']:.2f} ms "
+                      f"({st['cpu_ms'] * self.rate / 10:.0f}% of a core)  {st['late']} late",
+                      file=sys.stderr)
+            due += period
+            delay = due - loop.time()
+            if delay < 0:
+                self.late += 1
+                if delay < -1.0:
+                    due = loop.time()   # a second behind: don't try to catch up
+            await asyncio.sleep(max(0.0, delay))
+
+    async def serve(self, host="127.0.0.1", port=7370):
+        loop = asyncio.get_running_loop()
+        srv = await loop.create_server(lambda: _Conn(self), host, port, backlog=4096)
+        async with srv:
+            await self.run()
+
+
+# --- Test client: many random-input sessions over one event loop ---
+
+class _Client(asyncio.Protocol):
+    def __init__(self):
+        self.transport = None
+        self.buf = b""
+        self.tick = 0
+        self.updates = 0
+        self.bytes = 0
+        self.games = 0
+        self.stats = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        self.bytes += len(data)
+        self.buf += data
+        *lines, self.buf = self.buf.split(b"\n")
+        for line in lines:
+            msg = json.loads(line)
+            if "session" in msg:
+                self.games += 1
+            elif "stats" in msg:
+                self.stats = msg["stats"]
+                continue
+            elif "error" in msg:
+                print("server:", msg["error"], file=sys.stderr)
+                continue
+            self.updates += 1
+            self.tick = msg["tick"]
+            if msg.get("dead"):
+                self.send({"restart": None})
+
+    def send(self, obj):
+        self.transport.write(json.dumps(obj).encode() + b"\n")
+
+
+async def run_client(host, port, sessions, secs, seed=0):
+    loop = asyncio.get_running_loop()
+    rng = random.Random(seed)
+    conns = []
+    for _ in range(sessions):
+        conns.append((await loop.create_connection(_Client, host, port))[1])
+    print(f"{sessions} sessions connected", file=sys.stderr)
+    keys = (IN_LEFT, IN_RIGHT, IN_CW, IN_CCW, 0, IN_HARD)
+    end = loop.time() + secs
+    while loop.time() < end:
+        # Each session taps about 4 times a second, a few ticks ahead of the server
+        for c in rng.sample(conns, len(conns) // 5):
+            c.send({"t": c.tick + 4, "in": rng.choice(keys)})
+        await asyncio.sleep(0.05)
+    conns[0].send({"stats": True})
+    while conns[0].stats is None:
+        await asyncio.sleep(0.01)
+    updates = sum(c.updates for c in conns)
+    nbytes = sum(c.bytes for c in conns)
+    games = sum(c.games for c in conns)
+    print(f"{updates / secs:.0f} updates/s  {nbytes / secs / 1024:.0f} KiB/s  {games} games",
+          file=sys.stderr)
+    print(json.dumps(conns[0].stats))
+    for c in conns:
+        c.transport.close()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Headless game server (JSON lines over TCP).")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=7370)
+    ap.add_argument("--rate", type=int, default=60, help="server ticks per second")
+    ap.add_argument("--client", type=int, metavar="N", help="run N test sessions against a server instead")
+    ap.add_argument("--secs", type=float, default=10.0, help="test client duration")
+    args = ap.parse_args(argv)
+
+    try:
+        if args.client:
+            asyncio.run(run_client(args.host, args.port, args.client, args.secs))
+        else:
+            asyncio.run(Server(args.rate).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
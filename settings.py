@@ -34,6 +34,7 @@ class Settings:
 
     # Piece colors
     COLORS: dict = None
+    GARBAGE: tuple = (110, 122, 130)
 
     # Timing / controls (seconds)
     GRAVITY_START: float = 0.85
@@ -57,6 +58,17 @@ class Settings:
     # Line clear animation
     CLEAR_ANIM_TIME: float = 0.18
 
+    # Practice mode: memory budget for the rewind history (bytes)
+    REWIND_MEMORY: int = 256 * 1024
+
+    # Fixed-tick simulation (Game.step): ticks per second
+    TICK_RATE: int = 120
+
+    # Autoplay (menu A): bot placement rate, pieces per second
+    BOT_PPS: float = 20.0
+    # Pieces the autoplay search looks ahead through the preview queue
+    BOT_DEPTH: int = 3
+
 S = Settings(COLORS={
     "I": (0, 220, 235),
     "O": (245, 230, 0),
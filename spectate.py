@@ -0,0 +1,380 @@
+# spectate.py
+import sys
+import time
+import zlib
+import random
+import socket
+import struct
+import asyncio
+import argparse
+
+from settings import S
+from tetris import Game, Piece, KIND_CODE, CODE_KIND, QUEUE_LEN
+from bot import Bot
+from replay import Player, open_replay
+
+# Spectator stream: frames back to back, a type byte then its payload.
+#   KEY      u16 length + zlib(Game.dump_state(hide_seed=True) + queue codes)
+#   LOCK     kind, rot, x, y of the piece locking (cells written)
+#   CLEAR    u32 bits of the rows removed
+#   SPAWN    kind of the new current piece, kind entering the queue
+#   HOLD     hold kind, current kind, hold_used (after a hold)
+#   GARBAGE  row count, then the gap column of each row, top to bottom
+#   SCORE    u32 score, u16 lines, u8 dead          (per flush, if changed)
+#   PIECE    rot, x, y of the falling piece         (per flush, if moved)
+# Keyframes carry the queue rather than the piece seed: spectators see no
+# further ahead than the player does.
+
+KEY, LOCK, CLEAR, SPAWN, HOLD, GARBAGE, SCORE, PIECE = range(1, 9)
+_FRAMES = {
+    LOCK: struct.Struct("<BBbb"),
+    CLEAR: struct.Struct("<I"),
+    SPAWN: struct.Struct("<BB"),
+    HOLD: struct.Struct("<BBB"),
+    SCORE: struct.Struct("<IHB"),
+    PIECE: struct.Struct("<Bbb"),
+}
+_U16 = struct.Struct("<H")
+
+KEYFRAME_TICKS = S.TICK_RATE * 10
+MAX_BUFFER = 1 << 16    # unsent bytes before a spectator is dropped
+
+
+def _frame(kind, *vals):
+    return bytes((kind,)) + _FRAMES[kind].pack(*vals)
+
+
+class Broadcaster:
+    """Game observer turning transitions into spectator frames. flush()
+    returns what happened since the last call, plus the piece and score if
+    they changed, or just a keyframe when one is due (every keyframe_ticks,
+    and after a reset)."""
+
+    def __init__(self, keyframe_ticks=KEYFRAME_TICKS):
+        self.keyframe_ticks = keyframe_ticks
+        self.game = None
+        self.out = bytearray()
+
+    def attach(self, game):
+        if self.game is not None:
+            self.game.observers.remove(self)
+        self.game = game
+        game.observers.append(self)
+        self.need_key = True
+
+    def keyframe(self):
+        g = self.game
+        body = g.dump_state(hide_seed=True) + bytes(KIND_CODE[k] for k in g.queue)
+        z = zlib.compress(body, 9)
+        return bytes((KEY,)) + _U16.pack(len(z)) + z
+
+    def flush(self):
+        g, c = self.game, self.game.cur
+        piece, score = (c.rot, c.x, c.y), (g.score, g.lines, g.dead)
+        if self.need_key or g.tick - self.key_tick >= self.keyframe_ticks:
+            self.out = bytearray(self.keyframe())
+            self.need_key = False
+            self.key_tick = g.tick
+        else:
+            if piece != self.piece:
+                self.out += _frame(PIECE, *piece)
+            if score != self.score:
+                self.out += _frame(SCORE, *score)
+        self.piece, self.score = piece, score
+        data = bytes(self.out)
+        self.out.clear()
+        return data
+
+    # Observer hooks
+    def on_reset(self, game):
+        self.need_key = True
+
+    def on_lock(self, game):
+        c = game.cur
+        self.out += _frame(LOCK, KIND_CODE[c.kind], c.rot, c.x, c.y)
+        self.piece = (c.rot, c.x, c.y)
+
+    def on_clear(self, game, rows):
+        self.out += _frame(CLEAR, sum(1 << y for y in rows))
+
+    def on_spawn(self, game):
+        self.out += _frame(SPAWN, KIND_CODE[game.cur.kind], KIND_CODE[game.queue[-1]])
+        self.piece = (0, 3, 0)
+
+    def on_hold(self, game):
+        self.out += _frame(HOLD, KIND_CODE[game.hold_kind], KIND_CODE[game.cur.kind], game.hold_used)
+        self.piece = (0, 3, 0)
+
+    def on_garbage(self, game, holes):
+        self.out += bytes((GARBAGE, len(holes))) + bytes(holes)
+
+
+class Mirror:
+    """Rebuilds a Game from a spectator stream; feed() bytes as they arrive.
+    game is None until the first keyframe."""
+
+    def __init__(self):
+        self.game = None
+        self.buf = bytearray()
+
+    def feed(self, data):
+        buf = self.buf
+        buf += data
+        off, n = 0, len(buf)
+        while off < n:
+            kind = buf[off]
+            if kind == KEY:
+                if off + 3 > n:
+                    break
+                end = off + 3 + _U16.unpack_from(buf, off + 1)[0]
+                if end > n:
+                    break
+                self._keyframe(zlib.decompress(buf[off + 3:end]))
+            elif kind == GARBAGE:
+                if off + 2 > n:
+                    break
+                end = off + 2 + buf[off + 1]
+                if end > n:
+                    break
+                if self.game is not None:
+                    self.game.add_garbage(list(buf[off + 2:end]))
+            elif kind in _FRAMES:
+                end = off + 1 + _FRAMES[kind].size
+                if end > n:
+                    break
+                if self.game is not None:
+                    self._apply(kind, _FRAMES[kind].unpack_from(buf, off + 1))
+            else:
+                raise ValueError(f"bad frame type {kind}")
+            off = end
+        del buf[:off]
+
+    def _keyframe(self, body):
+        g = Game.from_state(body)
+        g.queue = [CODE_KIND[k] for k in body[-QUEUE_LEN:]]
+        # Animation timers count down locally in seconds, not the stream's ticks
+        g.clear_anim_len = S.CLEAR_ANIM_TIME
+        g.clear_anim_t = g.clear_anim_len if g.clearing_rows else 0.0
+        self.game = g
+
+    def _apply(self, kind, vals):
+        g = self.game
+        if kind == LOCK:
+            k, rot, x, y = vals
+            g.cur = Piece(CODE_KIND[k], x, y)
+            g.cur.rot = rot
+            g.place(g.cur)
+            g.clearing_rows = [y for y, m in enumerate(g.masks) if m == g.full_mask]
+            g.clear_anim_t = g.clear_anim_len if g.clearing_rows else 0.0
+        elif kind == CLEAR:
+            g.remove_rows([y for y in range(len(g.masks)) if vals[0] >> y & 1])
+            g.clearing_rows = []
+            g.clear_anim_t = 0.0
+        elif kind == SPAWN:
+            g.cur = Piece(CODE_KIND[vals[0]], 3, 0)
+            g.queue = g.queue[1:] + [CODE_KIND[vals[1]]]
+            g.hold_used = False
+        elif kind == HOLD:
+            g.hold_kind = CODE_KIND[vals[0]]
+            g.cur = Piece(CODE_KIND[vals[1]], 3, 0)
+            g.hold_used = bool(vals[2])
+        elif kind == SCORE:
+            g.score, g.lines, dead = vals
+            g.level = 1 + g.lines // 10
+            g.dead = bool(dead)
+        elif kind == PIECE:
+            g.cur.rot, g.cur.x, g.cur.y = vals
+
+
+# --- Sources: something with .game and advance(ticks) ---
+
+class BotSource:
+    """Greedy bot at a human pace; a new game after each top-out."""
+
+    def __init__(self, pps=2.5, seed=None):
+        self.bot = Bot()
+        self.every = round(S.TICK_RATE / pps)
+        self.rng = random.Random(seed)
+        self.new_game()
+
+    def new_game(self):
+        self.game = Game(seed=self.rng.getrandbits(32), fixed_tick=True)
+        self.wait = self.every
+
+    def advance(self, ticks):
+        while ticks > 0:
+            if self.game.dead:
+                self.new_game()
+            n = min(ticks, self.wait)
+            self.game.step(0, n)
+            ticks -= n
+            self.wait -= n
+            if self.wait == 0:
+                self.bot.play(self.game)   # None mid clear animation: next time then
+                self.wait = self.every
+
+
+class ReplayLoop(Player):
+    """A replay played over and over."""
+
+    def advance(self, ticks=1):
+        if self.done:
+            self.seek(0)
+        super().advance(ticks)
+
+
+def _source(args):
+    return ReplayLoop(open_replay(args.replay)) if args.replay else BotSource(seed=args.seed)
+
+
+async def serve(source, host="127.0.0.1", port=7371, rate=20):
+    """Run `source` in real time, flushing frames to every spectator `rate`
+    times a second; joiners get a keyframe between flushes."""
+    b = Broadcaster()
+    b.attach(source.game)
+    b.flush()
+    watchers, joining = set(), []
+
+    async def handle(reader, writer):
+        joining.append(writer)
+        try:
+            while await reader.read(4096):
+                pass
+        except ConnectionError:
+            pass
+        finally:
+            watchers.discard(writer)
+            writer.close()
+
+    srv = await asyncio.start_server(handle, host, port)
+    loop = asyncio.get_running_loop()
+    ticks = S.TICK_RATE // rate
+    due = loop.time()
+    async with srv:
+        while True:
+            source.advance(ticks)
+            if source.game is not b.game:
+                b.attach(source.game)
+            data = b.flush()
+            for w in list(watchers):
+                if w.transport.get_write_buffer_size() > MAX_BUFFER:
+                    watchers.discard(w)
+                    w.close()
+                elif data:
+                    w.write(data)
+            if joining:
+                key = b.keyframe()
+                for w in joining:
+                    if not w.is_closing():
+                        w.write(key)
+                        watchers.add(w)
+                joining.clear()
+            due += 1.0 / rate
+            await asyncio.sleep(max(0.0, due - loop.time()))
+
+
+def watch(host="127.0.0.1", port=7371):
+    import pygame
+    from main import _init_display, _draw_board
+
+    pygame.init()
+    clock = pygame.time.Clock()
+    screen, ui = _init_display()
+    pygame.display.set_caption(f"Tetris - spectating {host}:{port}")
+    sock = socket.create_connection((host, port))
+    sock.setblocking(False)
+    mirror = Mirror()
+    t0 = time.time()
+    last, nbytes = 0.0, 0
+    while True:
+        dt = clock.tick(S.FPS) / 1000.0
+        for e in pygame.event.get():
+            if e.type == pygame.QUIT or e.type == pygame.KEYDOWN and e.key == pygame.K_ESCAPE:
+                sock.close()
+                pygame.quit()
+                return
+        try:
+            while True:
+                data = sock.recv(65536)
+                if not data:
+                    print("stream ended", file=sys.stderr)
+                    sock.close()
+                    pygame.quit()
+                    return
+                nbytes += len(data)
+                mirror.feed(data)
+        except BlockingIOError:
+            pass
+
+        t = time.time() - t0
+        if t - last >= 5.0:
+            print(f"{nbytes / (t - last):.0f} B/s", file=sys.stderr)
+            nbytes, last = 0, t
+        g = mirror.game
+        ui.draw_background(t)
+        if g is not None:
+            if g.clear_anim_t > 0:
+                g.clear_anim_t = max(0.0, g.clear_anim_t - dt)
+            _draw_board(ui, g)
+            ui.draw_panel(g, t)
+            if g.dead:
+                ui.draw_game_over(g)
+        pygame.display.flip()
+
+
+def _same(a, b):
+    return (a.masks == b.masks and a.grid == b.grid and a.queue == b.queue
+            and (a.cur.kind, a.cur.rot, a.cur.x, a.cur.y) == (b.cur.kind, b.cur.rot, b.cur.x, b.cur.y)
+            and (a.hold_kind, a.hold_used, a.score, a.lines, a.dead)
+            == (b.hold_kind, b.hold_used, b.score, b.lines, b.dead))
+
+
+def bench(source, secs, rate=20):
+    """Run `secs` of game time through a Broadcaster and a Mirror, checking
+    the mirror after every flush; prints bytes per second."""
+    b, m = Broadcaster(), Mirror()
+    total = keys = worst = second = 0
+    per_second = rate
+    ticks = S.TICK_RATE // rate
+    for i in range(int(secs * rate)):
+        source.advance(ticks)
+        if source.game is not b.game:
+            b.attach(source.game)
+        data = b.flush()
+        total += len(data)
+        keys += len(data) if data[:1] == bytes((KEY,)) else 0
+        second += len(data)
+        if (i + 1) % per_second == 0:
+            worst, second = max(worst, second), 0
+        m.feed(data)
+        if not _same(source.game, m.game):
+            print(f"mirror out of sync after {i / rate:.2f}s", file=sys.stderr)
+            return False
+    print(f"{total / secs:.0f} B/s average, {worst} B/s worst second, "
+          f"{keys / total:.0%} keyframes ({total} bytes over {secs:.0f}s)")
+    return True
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Spectator streaming: binary state deltas over TCP.")
+    ap.add_argument("mode", choices=("serve", "watch", "bench"))
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=7371)
+    ap.add_argument("--replay", help="broadcast this replay (looped) instead of a bot game")
+    ap.add_argument("--seed", type=int, default=None, help="bot game seeds")
+    ap.add_argument("--secs", type=float, default=300.0, help="bench: game seconds")
+    args = ap.parse_args(argv)
+
+    try:
+        if args.mode == "serve":
+            asyncio.run(serve(_source(args), args.host, args.port))
+        elif args.mode == "watch":
+            watch(args.host, args.port)
+        else:
+            sys.exit(0 if bench(_source(args), args.secs) else 1)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
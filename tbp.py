@@ -0,0 +1,412 @@
+# tbp.py
+import sys
+import json
+import time
+import socket
+import argparse
+import socketserver
+from collections import deque
+
+import movegen
+from settings import S
+from pieces import SHAPE_TABLE
+from tetris import Game
+from bot import Bot, apply_placement
+
+# JSON lines after the community Tetris Bot Protocol (TBP): the bot sends
+# info, the game sends rules and waits for ready, then per game start /
+# suggest -> suggestion / play + new_piece ... / stop, and quit at the end.
+#
+#   board     40 rows bottom up, 10 cells each: null or a piece letter / "G"
+#   queue     current piece first, then the preview
+#   location  {"type", "orientation": north|east|south|west, "x", "y"} of the
+#             piece's center cell (x right, y up from the bottom row)
+#
+# Batch mode (our extension): with several games on one connection every
+# game message carries an "id" and the bot echoes it, so requests for many
+# games are in flight at once. Without ids it's plain one-game-at-a-time TBP.
+# A bad request gets {"type": "error", "request": <its type>, "reason"}: play
+# and new_piece only ever reply with an error, suggest always gets one reply.
+
+ORIENTATIONS = ("north", "east", "south", "west")
+BOARD_ROWS = 40
+_H = S.ROWS + S.HIDDEN_ROWS
+_FULL = (1 << S.COLS) - 1
+
+# TBP cells of each piece facing north, relative to its center (y up);
+# other orientations are these turned clockwise about the center
+_NORTH = {
+    "I": ((-1, 0), (0, 0), (1, 0), (2, 0)),
+    "O": ((0, 0), (1, 0), (0, 1), (1, 1)),
+    "T": ((-1, 0), (0, 0), (1, 0), (0, 1)),
+    "L": ((-1, 0), (0, 0), (1, 0), (1, 1)),
+    "J": ((-1, 0), (0, 0), (1, 0), (-1, 1)),
+    "S": ((-1, 0), (0, 0), (0, 1), (1, 1)),
+    "Z": ((-1, 1), (0, 1), (0, 0), (1, 0)),
+}
+
+
+def _center(kind, rot):
+    # Where the TBP center sits in our shape box (x right, y down): every
+    # rotation of ours is a translation of the same TBP orientation
+    cells = list(_NORTH[kind])
+    for _ in range(rot):
+        cells = [(y, -x) for x, y in cells]
+    ox, oy = min(cells)
+    bx, by = min((x, -y) for x, y in SHAPE_TABLE[kind][rot].blocks)
+    return bx - ox, -(by - oy)
+
+
+_CENTER = {k: [_center(k, r) for r in range(4)] for k in _NORTH}
+
+
+def to_location(p):
+    """TBP location of a movegen Placement."""
+    cx, cy = _CENTER[p.kind][p.rot]
+    return {"type": p.kind, "orientation": ORIENTATIONS[p.rot],
+            "x": p.x + cx, "y": _H - 1 - (p.y + cy)}
+
+
+def from_location(loc):
+    """Placement (empty path) for a TBP location; ValueError if malformed."""
+    try:
+        kind, rot = loc["type"], ORIENTATIONS.index(loc["orientation"])
+        cx, cy = _CENTER[kind][rot]
+        return movegen.Placement(kind, rot, int(loc["x"]) - cx, _H - 1 - int(loc["y"]) - cy, ())
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"bad location {loc!r}") from e
+
+
+def board_of(game):
+    rows = [[None] * S.COLS for _ in range(BOARD_ROWS)]
+    for y, m in enumerate(game.masks):
+        rows[_H - 1 - y] = [("G" if m >> x & 1 else None) for x in range(S.COLS)]
+    return rows
+
+
+def masks_of(board):
+    masks = [0] * _H
+    for r, row in enumerate(board[:_H]):
+        masks[_H - 1 - r] = sum(1 << x for x, c in enumerate(row) if c is not None)
+    return masks
+
+
+class Conn:
+    """JSON lines over a socket. send() only queues; flush() once idle, i.e.
+    when every message already received has been handled, so a burst of
+    requests is answered with one write."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.buf = b""
+        self.inbox = deque()
+        self.out = bytearray()
+
+    @property
+    def idle(self):
+        return not self.inbox
+
+    def send(self, msg, gid=None):
+        if gid is not None:
+            msg["id"] = gid
+        self.out += json.dumps(msg, separators=(",", ":")).encode() + b"\n"
+
+    def flush(self):
+        if self.out:
+            self.sock.sendall(self.out)
+            self.out.clear()
+
+    def recv(self):
+        while not self.inbox:
+            data = self.sock.recv(1 << 16)
+            if not data:
+                raise ConnectionError("connection closed")
+            *lines, self.buf = (self.buf + data).split(b"\n")
+            self.inbox.extend(line for line in lines if line.strip())
+        return json.loads(self.inbox.popleft())
+
+
+# --- Game side ---
+
+class _Slot:
+    """One game against the bot."""
+
+    def __init__(self, gid, seed):
+        self.id = gid
+        self.seed = seed
+        self.game = Game(seed=seed, clear_anim=False)
+        self.revealed = self.game.piece_index + len(self.game.queue)
+        self.illegal = 0
+        self.wait = 0.0
+        self.asked = 0.0
+        self.pending = 0        # suggests not answered yet
+        self.stopping = False   # stop sent: only draining replies now
+        self.error = None
+
+    def start_msg(self):
+        g = self.game
+        return {"type": "start", "hold": g.hold_kind, "queue": [g.cur.kind] + list(g.queue),
+                "combo": 0, "back_to_back": False, "board": board_of(g)}
+
+    def legal(self, loc):
+        """Input path playing `loc`, or None if it can't be played now."""
+        g = self.game
+        want = from_location(loc)
+        prefix = ()
+        if want.kind != g.cur.kind:
+            alt = g.hold_kind or (g.queue[0] if g.queue else None)
+            if g.hold_used or alt != want.kind:
+                return None
+            prefix = ("hold",)
+        start = None if not prefix else (3, 0, 0)
+        rows = want.rows()
+        for p in movegen.placements(g, kind=want.kind, start=start):
+            if p.rows() == rows:
+                return prefix + p.path
+        return None
+
+    def play(self, moves):
+        """Play the first legal move of a suggestion through Game's player
+        calls; returns it, or None (the game ends) if there's none."""
+        self.wait += time.perf_counter() - self.asked
+        for move in moves:
+            try:
+                path = self.legal(move["location"])
+            except (ValueError, KeyError, TypeError):
+                path = None
+            if path is not None:
+                movegen.play(self.game, path)
+                return move
+        self.illegal += 1
+        return None
+
+    def new_pieces(self):
+        g = self.game
+        end = g.piece_index + len(g.queue)
+        kinds = [g.seq[i] for i in range(self.revealed, end)]
+        self.revealed = end
+        return kinds
+
+
+def run(conn, seeds, batch=1, max_pieces=500):
+    """Play one game per seed against the bot at the other end of `conn`,
+    `batch` games in flight at a time. Returns a result dict per game."""
+    info = conn.recv()
+    if info.get("type") != "info":
+        raise ConnectionError(f"expected info, got {info!r}")
+    conn.send({"type": "rules", "randomizer": "seven_bag"})
+    conn.flush()
+    msg = conn.recv()
+    if msg.get("type") != "ready":
+        raise ConnectionError(f"bot not ready: {msg!r}")
+
+    seeds = iter(seeds)
+    slots, results = {}, []
+    next_id = 0
+
+    def begin():
+        nonlocal next_id
+        seed = next(seeds, None)
+        if seed is None:
+            return
+        gid = next_id if batch > 1 else None
+        next_id += 1
+        slot = slots[gid] = _Slot(gid, seed)
+        conn.send(slot.start_msg(), gid)
+        ask(slot)
+
+    def ask(slot):
+        conn.send({"type": "suggest"}, slot.id)
+        slot.pending += 1
+        slot.asked = time.perf_counter()
+
+    def stop(slot):
+        conn.send({"type": "stop"}, slot.id)
+        slot.stopping = True
+
+    def finish(slot):
+        # Only once nothing is in flight for its id, so the id (None too,
+        # in one-game mode) is free for the next game
+        g = slot.game
+        del slots[slot.id]
+        pieces = g.piece_index - 1 - (g.hold_kind is not None)   # spawned, minus current / held
+        results.append({"seed": slot.seed, "pieces": pieces, "lines": g.lines, "score": g.score,
+                        "dead": g.dead, "illegal": slot.illegal, "error": slot.error,
+                        "ms_per_move": round(slot.wait * 1000.0 / max(pieces, 1), 3)})
+        begin()
+
+    for _ in range(batch):
+        begin()
+    conn.flush()
+    while slots:
+        msg = conn.recv()
+        slot = slots.get(msg.get("id"))
+        if slot is None:
+            raise ConnectionError(f"unexpected message {msg!r}")
+        kind = msg.get("type")
+        # Errors for play / new_piece arrive before the reply to the suggest
+        # sent after them
+        if kind == "suggestion" or (kind == "error" and msg.get("request", "suggest") == "suggest"):
+            slot.pending -= 1
+        if slot.stopping:
+            pass    # a stale reply to a game already over
+        elif kind == "suggestion":
+            g = slot.game
+            move = slot.play(msg.get("moves", []))
+            if move is not None and not g.dead and g.piece_index < max_pieces:
+                conn.send({"type": "play", "move": move}, slot.id)
+                for piece in slot.new_pieces():
+                    conn.send({"type": "new_piece", "piece": piece}, slot.id)
+                ask(slot)
+            else:
+                stop(slot)
+        else:
+            slot.error = msg.get("reason") if kind == "error" else f"unexpected {kind!r}"
+            stop(slot)
+        if slot.stopping and not slot.pending:
+            finish(slot)
+        if conn.idle:
+            conn.flush()
+    conn.send({"type": "quit"})
+    conn.flush()
+    return results
+
+
+# --- Bot side: our greedy Bot as a TBP engine ---
+
+class _Engine:
+    """The bot's own copy of one game, kept from start / play / new_piece."""
+
+    def __init__(self, msg):
+        self.masks = masks_of(msg["board"])
+        self.queue = list(msg["queue"])
+        self.hold = msg.get("hold")
+
+    def suggest(self, bot, n=4):
+        cur = self.queue[0]
+        alt = self.hold or (self.queue[1] if len(self.queue) > 1 else None)
+        scored = []
+        for kind in (cur,) if alt in (None, cur) else (cur, alt):
+            for p in movegen.placements_on(self.masks, kind):
+                after, lines = apply_placement(self.masks, p, _FULL)
+                scored.append((bot.evaluate(after, S.COLS, lines), p))
+        scored.sort(key=lambda s: s[0], reverse=True)
+        return [{"location": to_location(p), "spin": "none"} for _, p in scored[:n]]
+
+    def play(self, move):
+        p = from_location(move["location"])
+        if p.kind != self.queue[0]:
+            if self.hold is None:
+                self.hold = self.queue.pop(0)
+            else:
+                self.hold, self.queue[0] = self.queue[0], self.hold
+        self.queue.pop(0)
+        self.masks = apply_placement(self.masks, p, _FULL)[0]
+
+
+class BotHandler(socketserver.BaseRequestHandler):
+    bot = Bot()
+
+    def handle(self):
+        conn = Conn(self.request)
+        conn.send({"type": "info", "name": "tetris-greedy", "version": "1",
+                   "author": "Tetris (Pygame)", "features": []})
+        conn.flush()
+        games = {}
+        while True:
+            try:
+                msg = conn.recv()
+            except ConnectionError:
+                return
+            except ValueError:
+                msg = {"type": "error"}
+            kind, gid = msg.get("type"), msg.get("id")
+            try:
+                if kind == "error":
+                    raise ValueError("bad JSON")
+                elif kind == "rules":
+                    conn.send({"type": "ready"})
+                elif kind == "start":
+                    games[gid] = _Engine(msg)
+                elif kind in ("suggest", "play", "new_piece"):
+                    game = games.get(gid)
+                    if game is None:
+                        raise ValueError("no game started" + (f" with id {gid}" if gid is not None else ""))
+                    if kind == "suggest":
+                        conn.send({"type": "suggestion", "moves": game.suggest(self.bot)}, gid)
+                    elif kind == "play":
+                        game.play(msg["move"])
+                    else:
+                        game.queue.append(msg["piece"])
+                elif kind == "stop":
+                    games.pop(gid, None)
+                elif kind == "quit":
+                    break
+            except (KeyError, ValueError, IndexError, TypeError) as e:
+                conn.send({"type": "error", "request": kind,
+                           "reason": f"{kind}: {e!r}" if isinstance(e, KeyError) else f"{kind}: {e}"}, gid)
+            if conn.idle:
+                conn.flush()
+        conn.flush()
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def _connect(args):
+    if args.unix:
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        s.connect(args.unix)
+    else:
+        s = socket.create_connection((args.host, args.port))
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return s
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="TBP-style bot protocol over a local socket.")
+    ap.add_argument("mode", choices=("bot", "play"),
+                    help="bot: serve our greedy bot; play: run games against a bot")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=7372)
+    ap.add_argument("--unix", metavar="PATH", help="Unix socket instead of TCP")
+    ap.add_argument("--games", type=int, default=20)
+    ap.add_argument("--seed-start", type=int, default=0)
+    ap.add_argument("--batch", type=int, default=1, help="games in flight on the connection")
+    ap.add_argument("--max-pieces", type=int, default=500)
+    ap.add_argument("--out", help="per-game results (JSON lines)")
+    args = ap.parse_args(argv)
+
+    if args.mode == "bot":
+        if args.unix:
+            srv = socketserver.ThreadingUnixStreamServer(args.unix, BotHandler)
+            srv.daemon_threads = True
+        else:
+            srv = _TCPServer((args.host, args.port), BotHandler)
+        try:
+            with srv:
+                srv.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    seeds = range(args.seed_start, args.seed_start + args.games)
+    with _connect(args) as s:
+        t0 = time.perf_counter()
+        results = run(Conn(s), seeds, args.batch, args.max_pieces)
+        dt = time.perf_counter() - t0
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as out:
+            for r in results:
+                out.write(json.dumps(r) + "\n")
+    pieces = sum(r["pieces"] for r in results)
+    illegal = sum(r["illegal"] for r in results)
+    print(f"{len(results)} games, {pieces} pieces in {dt:.1f}s ({pieces / dt:.0f} pieces/s), "
+          f"{sum(r['lines'] for r in results) / max(len(results), 1):.0f} lines/game, "
+          f"{illegal} illegal suggestions", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
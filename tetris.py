@@ -1,6 +1,8 @@
 # tetris.py
+import struct
+from typing import NamedTuple
 from settings import S
-from pieces import Bag, ROTATIONS, COLORS
+from pieces import PieceSequence, RANDOMIZERS, PIECES, SHAPE_TABLE, COLORS
 
 # SRS wall-kicks (y+ is down)
 JLSTZ_KICKS = {
@@ -31,6 +33,48 @@ I_KICKS = {
     (0, 3): [(0,0), (-1,0), (2,0), (-1,-2), (2,1)],
 }
 
+# Game.step input bits: LEFT/RIGHT/SOFT are held states, the rest fire once
+IN_LEFT = 1
+IN_RIGHT = 2
+IN_SOFT = 4
+IN_CW = 8
+IN_CCW = 16
+IN_HARD = 32
+IN_HOLD = 64
+IN_HELD = IN_LEFT | IN_RIGHT | IN_SOFT
+
+
+def to_ticks(sec):
+    return int(round(sec * S.TICK_RATE))
+
+LOCK_TICKS = to_ticks(S.LOCK_DELAY)
+DAS_TICKS = to_ticks(S.DAS)
+ARR_TICKS = to_ticks(S.ARR)
+CLEAR_TICKS = to_ticks(S.CLEAR_ANIM_TIME)
+
+
+# Binary state codec (dump_state / load_state): kinds and grid cells as small codes
+KIND_CODE = {k: i + 1 for i, k in enumerate(PIECES)}
+CODE_KIND = {c: k for k, c in KIND_CODE.items()}
+COLOR_CODE = {COLORS[k]: c for k, c in KIND_CODE.items()}
+CODE_COLOR = {c: COLORS[k] for k, c in KIND_CODE.items()}
+GARBAGE_CODE = len(PIECES) + 1
+COLOR_CODE[S.GARBAGE] = GARBAGE_CODE
+CODE_COLOR[GARBAGE_CODE] = S.GARBAGE
+
+RANDOMIZER_CODE = {name: i for i, name in enumerate(RANDOMIZERS)}
+CODE_RANDOMIZER = {i: name for name, i in RANDOMIZER_CODE.items()}
+
+STATE_VERSION = 2
+_STATE_HEAD = struct.Struct("<BIIIHBBbbBBBB5dQI")
+_STATE_FLAGS = ("hold_used", "dead", "paused", "left_held", "right_held",
+                "soft_drop", "fixed_tick", "clear_anim")
+
+
+# Visible next pieces (Game.preview() looks further ahead)
+QUEUE_LEN = 5
+
+
 def get_kicks(kind, fr, to):
     if kind == "I":
         return I_KICKS.get((fr, to), [(0, 0)])
@@ -39,33 +83,82 @@ def get_kicks(kind, fr, to):
     return JLSTZ_KICKS.get((fr, to), [(0, 0)])
 
 
+class Snapshot(NamedTuple):
+    """Immutable, hashable simulation state (see Game.snapshot)."""
+    grid: tuple          # rows of color tuples / None
+    masks: tuple
+    col_top: tuple
+    cur: tuple           # (kind, x, y, rot)
+    hold_kind: str
+    hold_used: bool
+    seq: tuple           # (seed, randomizer)
+    piece_index: int
+    score: int
+    lines: int
+    level: int
+    tick: int
+    timers: tuple        # (drop_acc, lock_timer, das_t, arr_t, last_dir)
+    held: tuple          # (left_held, right_held, soft_drop)
+    clear: tuple         # (clear_anim_t, clearing_rows, pending_clear_rows)
+    dead: bool
+
+
 class Piece:
+    __slots__ = ("kind", "rot", "x", "y")
+
     def __init__(self, kind, x, y):
         self.kind = kind
         self.rot = 0
         self.x = x
         self.y = y
 
+    def shape(self, rot=None):
+        return SHAPE_TABLE[self.kind][self.rot if rot is None else rot]
+
     def blocks(self, rot=None, x=None, y=None):
-        r = self.rot if rot is None else rot
         px = self.x if x is None else x
         py = self.y if y is None else y
-        return [(px + bx, py + by) for (bx, by) in ROTATIONS[self.kind][r]]
+        return [(px + bx, py + by) for (bx, by) in self.shape(rot).blocks]
 
 
 class Game:
-    def __init__(self, effects=None):
+    def __init__(self, effects=None, bitboard=True, seed=None, fixed_tick=False, clear_anim=True,
+                 randomizer="7bag"):
         self.effects = effects
+        # bitboard=True: collision / full-row tests run on per-row int masks.
+        # bitboard=False: reference cell-by-cell scan of grid (same results).
+        self.bitboard = bitboard
+        self.seed = seed
+        self.randomizer = randomizer
+        # fixed_tick=True: driven by step(); every timer below counts whole ticks
+        # at S.TICK_RATE instead of seconds, so runs are exactly reproducible.
+        self.fixed_tick = fixed_tick
+        # clear_anim=False: full rows vanish on lock (headless / bots)
+        self.clear_anim = clear_anim
+        # Transition listeners: objects with any of on_reset(game),
+        # on_lock(game) (before cells are written), on_clear(game, rows)
+        # (before rows are removed), on_spawn(game) (new current piece),
+        # on_hold(game) (after a hold), on_garbage(game, holes) (rows added)
+        self.observers = []
         self.reset()
 
     def reset(self):
+        self._emit("on_reset")
         self.cols = S.COLS
         self.rows = S.ROWS
         self.hid = S.HIDDEN_ROWS
         self.grid = [[None for _ in range(self.cols)] for __ in range(self.rows + self.hid)]
 
-        self.bag = Bag()
-        self.queue = [self.bag.next() for _ in range(5)]
+        # Row bitmasks (bit x set == grid[y][x] occupied); grid keeps colors for rendering
+        self.full_mask = (1 << self.cols) - 1
+        self.masks = [0] * (self.rows + self.hid)
+        # Topmost occupied y per column (rows + hid when empty), kept in sync on lock/clear
+        self.col_top = [self.rows + self.hid] * self.cols
+
+        # Piece n is seq[n]; queue mirrors the next QUEUE_LEN for the UI
+        self.seq = PieceSequence(self.seed, self.randomizer)
+        self.piece_index = 0
+        self.queue = []
         self.hold_kind = None
         self.hold_used = False
 
@@ -73,25 +166,27 @@ class Game:
         self.lines = 0
         self.level = 1
 
-        self.gravity = S.GRAVITY_START
-        self.drop_acc = 0.0
+        self._recalc_gravity()
+        self.drop_acc = 0
+        self.tick = 0
 
-        self.lock_timer = 0.0
+        self.lock_timer = 0
         self.dead = False
         self.paused = False
 
         # Input repeat
         self.left_held = False
         self.right_held = False
-        self.das_t = 0.0
-        self.arr_t = 0.0
+        self.das_t = 0
+        self.arr_t = 0
         self.last_dir = 0
 
         self.soft_drop = False
 
         # Line clear animation state
         self.clearing_rows = []
-        self.clear_anim_t = 0.0
+        self.clear_anim_t = 0
+        self.clear_anim_len = CLEAR_TICKS if self.fixed_tick else S.CLEAR_ANIM_TIME
         self.pending_clear_rows = []
         self.just_cleared_rows = []
 
@@ -101,23 +196,183 @@ class Game:
         if self.dead:
             return
         self.paused = not self.paused
-        self.drop_acc = 0.0
-        self.das_t = 0.0
-        self.arr_t = 0.0
+        self.drop_acc = 0
+        self.das_t = 0
+        self.arr_t = 0
+
+    # --- Serialization ---
+    def dump_state(self, hide_seed=False):
+        """Full simulation state as compact bytes (effects/UI excluded).
+        hide_seed writes seed 0, for states shown to other players: the
+        seed would give away every piece to come."""
+        flags = 0
+        for i, name in enumerate(_STATE_FLAGS):
+            if getattr(self, name):
+                flags |= 1 << i
+        clearing = sum(1 << y for y in self.clearing_rows)
+        pending = sum(1 << y for y in self.pending_clear_rows)
+        head = _STATE_HEAD.pack(
+            STATE_VERSION, self.tick, self.score, self.lines, self.level,
+            KIND_CODE[self.cur.kind], self.cur.rot, self.cur.x, self.cur.y,
+            KIND_CODE.get(self.hold_kind, 0), self.last_dir & 0xFF, flags,
+            RANDOMIZER_CODE[self.randomizer],
+            self.drop_acc, self.lock_timer, self.das_t, self.arr_t, self.clear_anim_t,
+            0 if hide_seed else self.seq.seed & 0xFFFFFFFFFFFFFFFF, self.piece_index,
+        )
+        rows = struct.pack("<II", clearing, pending)
+        cells = bytes(COLOR_CODE.get(c, 0) for row in self.grid for c in row)
+        return head + rows + cells
+
+    def load_state(self, data):
+        """Restore what dump_state() produced; effects/UI are left untouched."""
+        data = memoryview(data)
+        (version, self.tick, self.score, self.lines, self.level,
+         kind, rot, x, y, hold, last_dir, flags, randomizer,
+         drop_acc, lock_timer, das_t, arr_t, clear_anim_t,
+         seed, self.piece_index) = _STATE_HEAD.unpack_from(data)
+        if version != STATE_VERSION:
+            raise ValueError(f"unsupported state version {version}")
+        for i, name in enumerate(_STATE_FLAGS):
+            setattr(self, name, bool(flags >> i & 1))
+        num = int if self.fixed_tick else float
+        self.drop_acc, self.lock_timer = num(drop_acc), num(lock_timer)
+        self.das_t, self.arr_t, self.clear_anim_t = num(das_t), num(arr_t), num(clear_anim_t)
+        self.clear_anim_len = CLEAR_TICKS if self.fixed_tick else S.CLEAR_ANIM_TIME
+        self.last_dir = last_dir - 256 if last_dir > 127 else last_dir
+
+        self.cur = Piece(CODE_KIND[kind], x, y)
+        self.cur.rot = rot
+        self.hold_kind = CODE_KIND.get(hold)
+
+        self.randomizer = CODE_RANDOMIZER[randomizer]
+        if self.seq.seed != seed or self.seq.randomizer != self.randomizer:
+            self.seq = PieceSequence(seed, self.randomizer)
+        self.seed = seed
+        self.queue = self.preview()
+
+        off = _STATE_HEAD.size
+        clearing, pending = struct.unpack_from("<II", data, off)
+        off += 8
+        h = self.rows + self.hid
+        self.clearing_rows = [y for y in range(h) if clearing >> y & 1]
+        self.pending_clear_rows = [y for y in range(h) if pending >> y & 1]
+        self.just_cleared_rows = []
+
+        cells = data[off:off + h * self.cols]
+        off += h * self.cols
+        self.grid = [[CODE_COLOR.get(c) for c in cells[y * self.cols:(y + 1) * self.cols]] for y in range(h)]
+        self.masks = [sum(1 << x for x, c in enumerate(row) if c is not None) for row in self.grid]
+        self._recalc_col_top()
+        self._recalc_gravity()
+
+    @classmethod
+    def from_state(cls, data, effects=None):
+        game = cls()
+        game.load_state(data)
+        game.effects = effects
+        return game
+
+    # --- Snapshots (search / undo) ---
+    def snapshot(self):
+        """Simulation state only: no effects, pause or particle bookkeeping."""
+        c = self.cur
+        return Snapshot(
+            tuple(map(tuple, self.grid)), tuple(self.masks), tuple(self.col_top),
+            (c.kind, c.x, c.y, c.rot), self.hold_kind, self.hold_used,
+            (self.seq.seed, self.seq.randomizer), self.piece_index,
+            self.score, self.lines, self.level, self.tick,
+            (self.drop_acc, self.lock_timer, self.das_t, self.arr_t, self.last_dir),
+            (self.left_held, self.right_held, self.soft_drop),
+            (self.clear_anim_t, tuple(self.clearing_rows), tuple(self.pending_clear_rows)),
+            self.dead,
+        )
+
+    def restore(self, snap):
+        """Inverse of snapshot(); effects and UI-facing state are untouched."""
+        self.grid = [list(r) for r in snap.grid]
+        self.masks = list(snap.masks)
+        self.col_top = list(snap.col_top)
+        kind, x, y, rot = snap.cur
+        self.cur = Piece(kind, x, y)
+        self.cur.rot = rot
+        self.hold_kind = snap.hold_kind
+        self.hold_used = snap.hold_used
+        if (self.seq.seed, self.seq.randomizer) != snap.seq:
+            self.seq = PieceSequence(*snap.seq)
+        self.randomizer = snap.seq[1]
+        self.piece_index = snap.piece_index
+        self.queue = self.preview()
+        self.score, self.lines, self.level, self.tick = snap.score, snap.lines, snap.level, snap.tick
+        self.drop_acc, self.lock_timer, self.das_t, self.arr_t, self.last_dir = snap.timers
+        self.left_held, self.right_held, self.soft_drop = snap.held
+        self.clear_anim_t, clearing, pending = snap.clear
+        self.clearing_rows = list(clearing)
+        self.pending_clear_rows = list(pending)
+        self.dead = snap.dead
+        self._recalc_gravity()
+
+    def clone(self):
+        """Detached copy for search: same simulation state, no effects."""
+        g = Game.__new__(Game)
+        g.__dict__.update(self.__dict__)
+        g.effects = None
+        g.observers = []
+        g.paused = False
+        g.grid = [r[:] for r in self.grid]
+        g.masks = self.masks[:]
+        g.col_top = self.col_top[:]
+        g.queue = self.queue[:]
+        g.clearing_rows = self.clearing_rows[:]
+        g.pending_clear_rows = self.pending_clear_rows[:]
+        g.just_cleared_rows = []
+        g.cur = Piece(self.cur.kind, self.cur.x, self.cur.y)
+        g.cur.rot = self.cur.rot
+        return g
 
     def _recalc_gravity(self):
         self.gravity = max(S.GRAVITY_MIN, S.GRAVITY_START * (S.GRAVITY_DECAY ** (self.level - 1)))
+        # Whole ticks per row; 0 means faster than one tick (20G)
+        self.gravity_ticks = int(self.gravity * S.TICK_RATE)
+        self.soft_ticks = int(self.gravity * S.SOFT_DROP_MULT * S.TICK_RATE)
+
+    def preview(self, depth=QUEUE_LEN):
+        """The next `depth` pieces after the current one."""
+        return self.seq.window(self.piece_index, depth)
 
     def spawn(self):
-        kind = self.queue.pop(0)
-        self.queue.append(self.bag.next())
+        kind = self.seq[self.piece_index]
+        self.piece_index += 1
+        self.queue = self.preview()
         self.cur = Piece(kind, 3, 0)
         self.hold_used = False
-        self.lock_timer = 0.0
+        self.lock_timer = 0
         if self._collides(self.cur):
             self.dead = True
+        self._emit("on_spawn")
 
     def _collides(self, piece, rot=None, x=None, y=None):
+        if not self.bitboard:
+            return self._collides_scan(piece, rot, x, y)
+
+        shape = SHAPE_TABLE[piece.kind][piece.rot if rot is None else rot]
+        px = piece.x if x is None else x
+        py = piece.y if y is None else y
+
+        # Walls and floor from the bounding box alone
+        rows = shape.shifted.get(px)
+        if rows is None:
+            return True
+        masks = self.masks
+        if py + shape.bottom >= len(masks):
+            return True
+
+        for dy, bits in rows:
+            ry = py + dy
+            if ry >= 0 and masks[ry] & bits:
+                return True
+        return False
+
+    def _collides_scan(self, piece, rot=None, x=None, y=None):
         for bx, by in piece.blocks(rot=rot, x=x, y=y):
             if bx < 0 or bx >= self.cols or by >= self.rows + self.hid:
                 return True
@@ -125,21 +380,40 @@ class Game:
                 return True
         return False
 
+    def _emit(self, event, *args):
+        for o in self.observers:
+            fn = getattr(o, event, None)
+            if fn is not None:
+                fn(self, *args)
+
     def _lock(self):
-        col = COLORS[self.cur.kind]
-        for bx, by in self.cur.blocks():
-            if 0 <= by < self.rows + self.hid:
-                self.grid[by][bx] = col
+        self._emit("on_lock")
+        self.place(self.cur)
 
         cleared = self._start_clear_if_any()
         if not cleared:
             self.spawn()
 
+    def place(self, p):
+        """Write a piece's cells into grid / masks / col_top (no lock or clear)."""
+        col = COLORS[p.kind]
+        for bx, by in p.shape().blocks:
+            gx, gy = p.x + bx, p.y + by
+            if 0 <= gy < self.rows + self.hid:
+                self.grid[gy][gx] = col
+                self.masks[gy] |= 1 << gx
+                if gy < self.col_top[gx]:
+                    self.col_top[gx] = gy
+
     def _start_clear_if_any(self):
-        full = []
-        for y in range(self.rows + self.hid):
-            if all(self.grid[y][x] is not None for x in range(self.cols)):
-                full.append(y)
+        if self.bitboard:
+            fm = self.full_mask
+            full = [y for y, m in enumerate(self.masks) if m == fm]
+        else:
+            full = []
+            for y in range(self.rows + self.hid):
+                if all(self.grid[y][x] is not None for x in range(self.cols)):
+                    full.append(y)
 
         if not full:
             return False
@@ -147,7 +421,7 @@ class Game:
         self.clearing_rows = full
         self.pending_clear_rows = full[:]
         self.just_cleared_rows = full[:]
-        self.clear_anim_t = S.CLEAR_ANIM_TIME
+        self.clear_anim_t = self.clear_anim_len if self.clear_anim else 0
 
         n = len(full)
         base = {1: 100, 2: 300, 3: 500, 4: 800}[n]
@@ -159,17 +433,84 @@ class Game:
         if self.effects:
             self.effects.shake.add(3 + 2 * n)
 
+        if not self.clear_anim:
+            self._finish_clear()
         return True
 
-    def hard_drop(self):
-        if self.dead or self.paused or self.clear_anim_t > 0:
+    def _finish_clear(self):
+        self._emit("on_clear", self.pending_clear_rows)
+        self.remove_rows(self.pending_clear_rows)
+        self.pending_clear_rows = []
+        self.clearing_rows = []
+        self.spawn()
+
+    def remove_rows(self, rows):
+        """Drop `rows` (no scoring): the rest compact downward in one pass,
+        fresh empty rows on top."""
+        gone = set(rows)
+        n = len(gone)
+        self.grid = [[None] * self.cols for _ in range(n)] + \
+            [row for y, row in enumerate(self.grid) if y not in gone]
+        self.masks = [0] * n + [m for y, m in enumerate(self.masks) if y not in gone]
+        self._recalc_col_top()
+
+    def add_garbage(self, holes):
+        """Push the stack up by one garbage row per entry of `holes` (the gap
+        column of each row, top to bottom), in one pass like remove_rows.
+        Meant for between pieces (an on_spawn observer): blocks pushed out of
+        the top, or into the new piece, top out."""
+        n = len(holes)
+        if not n or self.dead:
             return
+        if any(self.masks[:n]):
+            self.dead = True
+        self.grid = self.grid[n:] + [[None if x == h else S.GARBAGE for x in range(self.cols)] for h in holes]
+        self.masks = self.masks[n:] + [self.full_mask & ~(1 << h) for h in holes]
+        self._recalc_col_top()
+        if self._collides(self.cur):
+            self.dead = True
+        self._emit("on_garbage", holes)
+
+    def _recalc_col_top(self):
+        tops = [len(self.masks)] * self.cols
+        seen = 0
+        for y, m in enumerate(self.masks):
+            new = m & ~seen
+            if new:
+                seen |= m
+                for x in range(self.cols):
+                    if new >> x & 1:
+                        tops[x] = y
+                if seen == self.full_mask:
+                    break
+        self.col_top = tops
+
+    def _drop_distance(self):
+        p = self.cur
+        if self.bitboard:
+            # Piece bottom profile vs. column tops; exact while the piece is above the stack
+            tops = self.col_top
+            dist = len(self.masks)
+            for dx, dy in p.shape().bottoms:
+                d = tops[p.x + dx] - 1 - (p.y + dy)
+                if d < dist:
+                    dist = d
+            if dist >= 0:
+                return dist
+
+        # Tucked under an overhang (or reference mode): probe row by row
         dy = 0
-        while not self._collides(self.cur, y=self.cur.y + dy + 1):
+        while not self._collides(p, y=p.y + dy + 1):
             dy += 1
+        return dy
+
+    def hard_drop(self):
+        if self.dead or self.paused or self.clear_anim_t > 0:
+            return
+        dy = self._drop_distance()
         self.cur.y += dy
         self.score += 2 * dy
-        self.lock_timer = 0.0
+        self.lock_timer = 0
         self._lock()
 
     def hold(self):
@@ -185,6 +526,7 @@ class Game:
             self.cur.x, self.cur.y = 3, 0
             if self._collides(self.cur):
                 self.dead = True
+        self._emit("on_hold")
 
     def rotate(self, dir_):
         if self.dead or self.paused or self.clear_anim_t > 0:
@@ -195,7 +537,7 @@ class Game:
 
         if self.cur.kind == "O":
             self.cur.rot = nr
-            self.lock_timer = 0.0
+            self.lock_timer = 0
             return
 
         for ox, oy in get_kicks(self.cur.kind, fr, nr):
@@ -204,7 +546,7 @@ class Game:
             if not self._collides(self.cur, rot=nr, x=nx, y=ny):
                 self.cur.rot = nr
                 self.cur.x, self.cur.y = nx, ny
-                self.lock_timer = 0.0
+                self.lock_timer = 0
                 return
 
     def move(self, dx):
@@ -213,7 +555,7 @@ class Game:
         nx = self.cur.x + dx
         if not self._collides(self.cur, x=nx):
             self.cur.x = nx
-            self.lock_timer = 0.0
+            self.lock_timer = 0
             return True
         return False
 
@@ -229,10 +571,7 @@ class Game:
         return False
 
     def ghost_y(self):
-        dy = 0
-        while not self._collides(self.cur, y=self.cur.y + dy + 1):
-            dy += 1
-        return self.cur.y + dy
+        return self.cur.y + self._drop_distance()
 
     def update(self, dt):
         if self.dead or self.paused:
@@ -242,22 +581,22 @@ class Game:
         if self.clear_anim_t > 0:
             self.clear_anim_t = max(0.0, self.clear_anim_t - dt)
             if self.clear_anim_t == 0.0 and self.pending_clear_rows:
-                for y in sorted(self.pending_clear_rows):
-                    del self.grid[y]
-                    self.grid.insert(0, [None for _ in range(self.cols)])
-                self.pending_clear_rows = []
-                self.clearing_rows = []
-                self.spawn()
+                self._finish_clear()
             return
 
         # Gravity
         g = self.gravity * (S.SOFT_DROP_MULT if self.soft_drop else 1.0)
-        self.drop_acc += dt
-        while self.drop_acc >= g:
-            self.drop_acc -= g
-            moved = self.step_down()
-            if not moved:
-                break
+        if g < 1.0 / S.FPS:
+            # 20G: faster than a frame per row, snap straight to the floor
+            self.cur.y += self._drop_distance()
+            self.drop_acc = 0.0
+        else:
+            self.drop_acc += dt
+            while self.drop_acc >= g:
+                self.drop_acc -= g
+                moved = self.step_down()
+                if not moved:
+                    break
 
         # Lock delay when grounded
         grounded = self._collides(self.cur, y=self.cur.y + 1)
@@ -298,3 +637,108 @@ class Game:
             self.arr_t -= S.ARR
             if not self.move(dir_):
                 break
+
+    # --- Fixed-tick API (fixed_tick=True) ---
+    def step(self, inputs=0, ticks=1):
+        """Advance by whole ticks. `inputs` is a mask of IN_* bits: LEFT, RIGHT
+        and SOFT are held for every tick, CW/CCW/HARD/HOLD fire on the first."""
+        if self.dead or self.paused:
+            return
+        self.left_held = bool(inputs & IN_LEFT)
+        self.right_held = bool(inputs & IN_RIGHT)
+        self.soft_drop = bool(inputs & IN_SOFT)
+
+        if inputs & IN_HOLD:
+            self.hold()
+        if inputs & IN_CCW:
+            self.rotate(-1)
+        if inputs & IN_CW:
+            self.rotate(+1)
+
+        hard = bool(inputs & IN_HARD)
+        while ticks > 0 and not self.dead:
+            n = 0 if hard else self._skip_idle(ticks)
+            if not n:
+                n = 1
+                self._tick(hard)
+                hard = False
+            ticks -= n
+            self.tick += n
+
+    def _skip_idle(self, limit):
+        # Fast-forward a stretch where only counters would change (no shift held,
+        # no gravity row or lock due); returns the ticks consumed, 0 if none
+        if self.clear_anim_t > 0 or self.left_held or self.right_held or self.last_dir:
+            return 0
+        g = self.soft_ticks if self.soft_drop else self.gravity_ticks
+        if g == 0:
+            return 0
+        n = g - 1 - self.drop_acc
+        grounded = self._collides(self.cur, y=self.cur.y + 1)
+        if grounded:
+            n = min(n, LOCK_TICKS - 1 - self.lock_timer)
+        n = min(n, limit)
+        if n <= 0:
+            return 0
+        self.drop_acc += n
+        self.lock_timer = self.lock_timer + n if grounded else 0
+        return n
+
+    def _tick(self, hard=False):
+        # Line-clear animation
+        if self.clear_anim_t > 0:
+            self.clear_anim_t -= 1
+            if self.clear_anim_t == 0 and self.pending_clear_rows:
+                self._finish_clear()
+            return
+
+        # DAS/ARR sideways (before drops so a tap + hard drop lands shifted)
+        dir_ = 0
+        if self.left_held and not self.right_held:
+            dir_ = -1
+        elif self.right_held and not self.left_held:
+            dir_ = 1
+
+        if dir_ == 0:
+            self.das_t = 0
+            self.arr_t = 0
+            self.last_dir = 0
+        elif self.last_dir != dir_:
+            self.last_dir = dir_
+            self.das_t = 0
+            self.arr_t = 0
+            self.move(dir_)
+        elif self.das_t < DAS_TICKS:
+            self.das_t += 1
+        elif ARR_TICKS == 0:
+            while self.move(dir_):
+                pass
+        else:
+            self.arr_t += 1
+            if self.arr_t >= ARR_TICKS:
+                self.arr_t = 0
+                self.move(dir_)
+
+        if hard:
+            self.hard_drop()
+            return
+
+        # Gravity
+        g = self.soft_ticks if self.soft_drop else self.gravity_ticks
+        if g == 0:
+            self.cur.y += self._drop_distance()
+            self.drop_acc = 0
+        else:
+            self.drop_acc += 1
+            if self.drop_acc >= g:
+                self.drop_acc = 0
+                self.step_down()
+
+        # Lock delay when grounded
+        if self._collides(self.cur, y=self.cur.y + 1):
+            self.lock_timer += 1
+            if self.lock_timer >= LOCK_TICKS:
+                self.lock_timer = 0
+                self._lock()
+        else:
+            self.lock_timer = 0
@@ -0,0 +1,197 @@
+# tournament.py
+import os
+import sys
+import csv
+import json
+import time
+import signal
+import argparse
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import movegen
+from bot import Bot
+from tetris import Game
+
+FIELDS = ["config", "seed", "score", "lines", "level", "pieces", "died", "death_piece",
+          "seconds", "timeout", "error"]
+DEFAULT_CONFIGS = [{"name": "default"}]
+
+
+class _Timeout(Exception):
+    pass
+
+
+def _on_alarm(signum, frame):
+    raise _Timeout
+
+
+# Per-worker players, reused across games (and their search caches with them)
+_PLAYERS = {}
+
+
+def _player(config):
+    key = json.dumps(config, sort_keys=True)
+    p = _PLAYERS.get(key)
+    if p is None:
+        bot = Bot(config.get("weights"))
+        if config.get("depth"):
+            from search import Search
+            p = Search(bot, config["depth"], config.get("width", 6)).best
+        else:
+            def p(game):
+                choice = bot.choose(game)
+                return choice[0] if choice else None
+        _PLAYERS[key] = p
+    return p
+
+
+def play_game(config, seed, max_pieces, timeout=0):
+    """One headless game; returns a result row (see FIELDS)."""
+    row = dict.fromkeys(FIELDS)
+    row.update(config=config.get("name", "?"), seed=seed, timeout=False)
+    game = Game(seed=seed, clear_anim=False)
+    pieces = 0
+    t0 = time.perf_counter()
+    # A stuck game is interrupted by SIGALRM; the worker carries on with the next one
+    alarm = timeout and hasattr(signal, "setitimer")
+    if alarm:
+        signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        play = _player(config)
+        while pieces < max_pieces and not game.dead:
+            path = play(game)
+            if not path:
+                break
+            movegen.play(game, path)
+            pieces += 1
+    except _Timeout:
+        row["timeout"] = True
+    except Exception as e:
+        row["error"] = repr(e)
+    finally:
+        if alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    row.update(score=game.score, lines=game.lines, level=game.level, pieces=pieces,
+               died=game.dead, death_piece=pieces if game.dead else None,
+               seconds=round(time.perf_counter() - t0, 4))
+    return row
+
+
+def play_chunk(config, seeds, max_pieces, timeout):
+    """play_game for each seed in one worker task; the rows in seed order."""
+    return [play_game(config, s, max_pieces, timeout) for s in seeds]
+
+
+def _error_rows(job, error):
+    config, seeds = job
+    return [dict(dict.fromkeys(FIELDS), config=config.get("name", "?"), seed=s, error=error) for s in seeds]
+
+
+class _Sink:
+    """JSON lines (default) or CSV by file extension; '-' is stdout."""
+
+    def __init__(self, path):
+        self.f = sys.stdout if path == "-" else open(path, "w", newline="", encoding="utf-8")
+        self.csv = None
+        if path.endswith(".csv"):
+            self.csv = csv.DictWriter(self.f, FIELDS)
+            self.csv.writeheader()
+
+    def write(self, row):
+        if self.csv is not None:
+            self.csv.writerow(row)
+        else:
+            self.f.write(json.dumps(row) + "\n")
+
+    def close(self):
+        self.f.flush()
+        if self.f is not sys.stdout:
+            self.f.close()
+
+
+def run(configs, seeds, sink, max_pieces=1000, workers=None, timeout=0, chunk=16):
+    """Play every (config, seed) pair across a process pool, streaming rows to
+    `sink` as chunks finish. A broken pool (a worker killed outright) is
+    rebuilt and its unfinished chunks are retried once before they are
+    recorded as errors; a chunk that raises is recorded as errors straight
+    away. Returns the number of games written."""
+    workers = workers or os.cpu_count() or 1
+    jobs = [(c, seeds[i:i + chunk]) for c in configs for i in range(0, len(seeds), chunk)]
+    jobs.reverse()
+    tries = {}
+    done = 0
+    pool = ProcessPoolExecutor(workers)
+    running = {}
+    try:
+        while jobs or running:
+            # Bounded in-flight work: a 100k-game sweep never queues 100k futures
+            while jobs and len(running) < 2 * workers:
+                job = jobs.pop()
+                running[pool.submit(play_chunk, job[0], job[1], max_pieces, timeout)] = job
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            lost = []
+            for fut in finished:
+                job = running.pop(fut)
+                try:
+                    rows = fut.result()
+                except BrokenProcessPool:
+                    lost.append(job)
+                    continue
+                except Exception as e:
+                    # e.g. a _Timeout landing outside play_game's handler
+                    rows = _error_rows(job, repr(e))
+                for row in rows:
+                    sink.write(row)
+                done += len(rows)
+            if lost:
+                # Everything in flight went down with the pool
+                lost += running.values()
+                running.clear()
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = ProcessPoolExecutor(workers)
+                for job in lost:
+                    key = (job[0].get("name", "?"), job[1][0])
+                    tries[key] = tries.get(key, 0) + 1
+                    if tries[key] == 1:
+                        jobs.append(job)
+                        continue
+                    for row in _error_rows(job, "worker died"):
+                        sink.write(row)
+                    done += len(job[1])
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return done
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Headless bot tournament / seed sweep.")
+    ap.add_argument("--seeds", type=int, default=100, help="seeds per config (0..N-1 + --seed-start)")
+    ap.add_argument("--seed-start", type=int, default=0)
+    ap.add_argument("--configs", help="JSON file: list of {name, weights, depth, width}")
+    ap.add_argument("--max-pieces", type=int, default=1000)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--timeout", type=float, default=60.0, help="seconds per game (0 = none)")
+    ap.add_argument("--chunk", type=int, default=16, help="games per worker task")
+    ap.add_argument("--out", default="-", help="results file (.jsonl or .csv; '-' = stdout)")
+    args = ap.parse_args(argv)
+
+    configs = DEFAULT_CONFIGS
+    if args.configs:
+        with open(args.configs, encoding="utf-8") as f:
+            configs = json.load(f)
+    seeds = list(range(args.seed_start, args.seed_start + args.seeds))
+
+    sink = _Sink(args.out)
+    t0 = time.perf_counter()
+    try:
+        n = run(configs, seeds, sink, args.max_pieces, args.workers, args.timeout, args.chunk)
+    finally:
+        sink.close()
+    dt = time.perf_counter() - t0
+    print(f"{n} games in {dt:.1f}s ({n / dt:.1f} games/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
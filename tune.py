@@ -0,0 +1,152 @@
+# tune.py
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from pieces import mix
+from bot import WEIGHTS
+from tournament import play_chunk
+
+KEYS = sorted(WEIGHTS)
+
+
+def fitness(rows):
+    """Mean score over a candidate's games. Lines cleared stop telling
+    candidates apart once they all last --max-pieces; score still rewards
+    multi-line clears and dies with the game."""
+    return sum(r["score"] for r in rows) / len(rows) if rows else 0.0
+
+
+class Tuner:
+    """Separable evolution strategy over the evaluator weights: each generation
+    samples `popsize` candidates from a Gaussian with a per-weight step size,
+    then moves the mean to the rank-weighted average of the best half and
+    adapts each step size to how spread out that half is. A cut-down
+    CMA-ES (diagonal covariance only), which is plenty for five weights."""
+
+    def __init__(self, popsize=16, sigma=0.2, seed=0, mean=None):
+        self.popsize = popsize
+        self.seed = seed
+        self.gen = 0
+        self.mean = [float((mean or WEIGHTS)[k]) for k in KEYS]
+        self.sigma = [sigma] * len(KEYS)
+        self.best = None   # {"weights": ..., "fitness": ...}
+        self.history = []
+
+    # --- Checkpoints ---
+    def to_dict(self):
+        return {"popsize": self.popsize, "seed": self.seed, "gen": self.gen, "mean": self.mean,
+                "sigma": self.sigma, "best": self.best, "history": self.history}
+
+    @classmethod
+    def from_dict(cls, d):
+        t = cls(d["popsize"], seed=d["seed"])
+        t.gen, t.mean, t.sigma = d["gen"], d["mean"], d["sigma"]
+        t.best, t.history = d["best"], d["history"]
+        return t
+
+    def save(self, path):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=1)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    # --- One generation ---
+    def ask(self):
+        # Derived from (seed, generation) so a resumed run samples the same candidates
+        rng = random.Random(mix(self.seed, self.gen))
+        return [[m + s * rng.gauss(0.0, 1.0) for m, s in zip(self.mean, self.sigma)]
+                for _ in range(self.popsize)]
+
+    def game_seeds(self, n):
+        """Common random numbers: every candidate of a generation plays these."""
+        return [mix(self.seed, self.gen, i) & 0xFFFFFFFF for i in range(n)]
+
+    def tell(self, candidates, scores, best_score=None):
+        # best_score: self.best re-played on this generation's seeds, so the
+        # incumbent is compared on the same games as the candidates
+        order = sorted(range(len(candidates)), key=lambda i: scores[i], reverse=True)
+        mu = max(1, len(order) // 2)
+        w = [math.log(mu + 0.5) - math.log(i + 1) for i in range(mu)]
+        total = sum(w)
+        w = [x / total for x in w]
+        elite = [candidates[i] for i in order[:mu]]
+
+        old = self.mean
+        self.mean = [sum(wi * c[j] for wi, c in zip(w, elite)) for j in range(len(KEYS))]
+        for j in range(len(KEYS)):
+            spread = math.sqrt(sum(wi * (c[j] - old[j]) ** 2 for wi, c in zip(w, elite)))
+            self.sigma[j] = max(1e-3, 0.7 * self.sigma[j] + 0.3 * spread)
+
+        top = order[0]
+        if self.best is not None and best_score is not None:
+            self.best["fitness"] = best_score
+        if self.best is None or scores[top] > self.best["fitness"]:
+            self.best = {"weights": dict(zip(KEYS, candidates[top])), "fitness": scores[top]}
+        self.history.append({"gen": self.gen, "best": scores[top],
+                             "mean": sum(scores) / len(scores)})
+        self.gen += 1
+
+
+def evaluate(pool, candidates, seeds, max_pieces, timeout, chunk=4):
+    """Fitness of each candidate, its games spread over the pool."""
+    futs = []
+    for i, c in enumerate(candidates):
+        config = {"name": str(i), "weights": dict(zip(KEYS, c))}
+        for k in range(0, len(seeds), chunk):
+            futs.append((i, pool.submit(play_chunk, config, seeds[k:k + chunk], max_pieces, timeout)))
+    rows = [[] for _ in candidates]
+    for i, fut in futs:
+        rows[i] += fut.result()
+    return [fitness(r) for r in rows]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Tune bot evaluator weights in parallel.")
+    ap.add_argument("--generations", type=int, default=50)
+    ap.add_argument("--popsize", type=int, default=16)
+    ap.add_argument("--sigma", type=float, default=0.2)
+    ap.add_argument("--games", type=int, default=8, help="games per candidate per generation")
+    ap.add_argument("--max-pieces", type=int, default=500)
+    ap.add_argument("--timeout", type=float, default=60.0)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--checkpoint", default="tune.json", help="written after every generation")
+    ap.add_argument("--resume", action="store_true", help="continue from --checkpoint")
+    args = ap.parse_args(argv)
+
+    if args.resume and os.path.exists(args.checkpoint):
+        tuner = Tuner.load(args.checkpoint)
+        print(f"resuming at generation {tuner.gen}", file=sys.stderr)
+    else:
+        tuner = Tuner(args.popsize, args.sigma, args.seed)
+
+    t0 = time.perf_counter()
+    done = 0
+    with ProcessPoolExecutor(args.workers) as pool:
+        while tuner.gen < args.generations:
+            cands = tuner.ask()
+            extra = [[tuner.best["weights"][k] for k in KEYS]] if tuner.best else []
+            scores = evaluate(pool, cands + extra, tuner.game_seeds(args.games), args.max_pieces, args.timeout)
+            tuner.tell(cands, scores[:len(cands)], *scores[len(cands):])
+            tuner.save(args.checkpoint)
+            done += 1
+            rate = done / (time.perf_counter() - t0) * 60.0
+            h = tuner.history[-1]
+            print(f"gen {h['gen']:4d}  best {h['best']:7.2f}  mean {h['mean']:7.2f}  "
+                  f"{rate:.2f} gen/min", file=sys.stderr)
+    print(json.dumps(tuner.best, indent=1))
+
+
+if __name__ == "__main__":
+    main()
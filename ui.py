@@ -2,11 +2,11 @@ import pygame
 import math
 from settings import S
 from utils import draw_text, glow_rect, add_color, mul_color
-from pieces import COLORS, ROTATIONS
+from pieces import COLORS, SHAPE_TABLE
 
 
 class UI:
-    def __init__(self, screen):
+    def __init__(self, screen, board_x=None):
         self.screen = screen
 
         # Fonts
@@ -29,6 +29,11 @@ class UI:
         self.board_x = self.left_x + self.left_w + S.PAD
         self.right_x = self.board_x + self.board_px_w + S.PAD
         self.y0 = S.PAD
+        # Side panels only in the standard layout; a board placed elsewhere
+        # on the same screen (versus) draws its own column
+        self.panels = board_x is None
+        if board_x is not None:
+            self.board_x = board_x
 
         self.panel_pad = 16
         self.card_pad = 14
@@ -36,6 +41,8 @@ class UI:
         # cache background so we don’t redraw gradient per pixel every frame
         self._bg_cache = None
         self._bg_cache_size = None
+        # unscaled tiles by (color, alpha, ghost): the board redraws every cell each frame
+        self._tiles = {}
 
     # --- Rect helpers ---
     def board_rect(self):
@@ -91,12 +98,13 @@ class UI:
         return r
 
     # --- Board / tiles ---
-    def draw_background(self, t, shake=(0, 0)):
-        # cached gradient bg
-        if self._bg_cache is None or self._bg_cache_size != self.screen.get_size():
-            self._bg_cache = self._make_bg()
-            self._bg_cache_size = self.screen.get_size()
-        self.screen.blit(self._bg_cache, (0, 0))
+    def draw_background(self, t, shake=(0, 0), fill=True):
+        # cached gradient bg (fill=False: only this board's frame, over a screen already drawn)
+        if fill:
+            if self._bg_cache is None or self._bg_cache_size != self.screen.get_size():
+                self._bg_cache = self._make_bg()
+                self._bg_cache_size = self.screen.get_size()
+            self.screen.blit(self._bg_cache, (0, 0))
 
         sx, sy = int(shake[0]), int(shake[1])
 
@@ -119,10 +127,11 @@ class UI:
             pygame.draw.line(self.screen, S.GRID_LINE, (xx, br.y), (xx, br.bottom))
 
         # side panel outlines
-        lp = self.left_panel_rect().move(sx, sy)
-        rp = self.right_panel_rect().move(sx, sy)
-        pygame.draw.rect(self.screen, S.CARD_BORDER, lp, width=2, border_radius=18)
-        pygame.draw.rect(self.screen, S.CARD_BORDER, rp, width=2, border_radius=18)
+        if self.panels:
+            lp = self.left_panel_rect().move(sx, sy)
+            rp = self.right_panel_rect().move(sx, sy)
+            pygame.draw.rect(self.screen, S.CARD_BORDER, lp, width=2, border_radius=18)
+            pygame.draw.rect(self.screen, S.CARD_BORDER, rp, width=2, border_radius=18)
 
     def draw_tile(self, x, y, color, alpha=255, ghost=False, shake=(0, 0), scale=1.0):
         sx, sy = int(shake[0]), int(shake[1])
@@ -131,6 +140,27 @@ class UI:
         py += sy
         r = pygame.Rect(px, py, S.TILE, S.TILE)
 
+        key = (color, alpha, ghost)
+        tile = self._tiles.get(key) if scale == 1.0 else None
+        if tile is None:
+            tile = self._make_tile(color, alpha, ghost)
+            if scale == 1.0:
+                self._tiles[key] = tile
+
+        # scaled draw (for line clear animation)
+        if scale != 1.0:
+            s = max(2, int(S.TILE * scale))
+            scaled = pygame.transform.smoothscale(tile, (s, s))
+            ox = (S.TILE - s) // 2
+            oy = (S.TILE - s) // 2
+            self.screen.blit(scaled, (r.x + ox, r.y + oy))
+        else:
+            self.screen.blit(tile, r.topleft)
+
+        if (not ghost) and S.GLOW_PASSES > 0 and scale >= 0.6:
+            glow_rect(self.screen, r, color, intensity=45, passes=1, radius=10)
+
+    def _make_tile(self, color, alpha, ghost):
         tile = pygame.Surface((S.TILE, S.TILE), pygame.SRCALPHA)
 
         if ghost:
@@ -149,24 +179,12 @@ class UI:
             strip = tile.get_rect().inflate(-6, -6)
             strip.h = max(4, strip.h // 4)
             pygame.draw.rect(tile, hi, strip, border_radius=5)
-
-        # scaled draw (for line clear animation)
-        if scale != 1.0:
-            s = max(2, int(S.TILE * scale))
-            scaled = pygame.transform.smoothscale(tile, (s, s))
-            ox = (S.TILE - s) // 2
-            oy = (S.TILE - s) // 2
-            self.screen.blit(scaled, (r.x + ox, r.y + oy))
-        else:
-            self.screen.blit(tile, r.topleft)
-
-        if (not ghost) and S.GLOW_PASSES > 0 and scale >= 0.6:
-            glow_rect(self.screen, r, color, intensity=45, passes=1, radius=10)
+        return tile
 
     def draw_grid_cells(self, game, shake=(0, 0)):
         prog = 0.0
         if getattr(game, "clear_anim_t", 0.0) > 0:
-            prog = 1.0 - (game.clear_anim_t / max(S.CLEAR_ANIM_TIME, 1e-6))
+            prog = 1.0 - (game.clear_anim_t / max(getattr(game, "clear_anim_len", S.CLEAR_ANIM_TIME), 1e-6))
 
         clearing = set(getattr(game, "clearing_rows", []))
 
@@ -184,10 +202,12 @@ class UI:
                     self.draw_tile(gx, vy, col, shake=shake)
 
     def draw_piece(self, piece, offset_y_hidden=True, alpha=255, ghost=False, shake=(0, 0)):
-        for gx, gy in piece.blocks():
+        col = COLORS[piece.kind]
+        for bx, by in piece.shape().blocks:
+            gy = piece.y + by
             vy = gy - S.HIDDEN_ROWS if offset_y_hidden else gy
             if 0 <= vy < S.ROWS:
-                self.draw_tile(gx, vy, COLORS[piece.kind], alpha=alpha, ghost=ghost, shake=shake)
+                self.draw_tile(piece.x + bx, vy, col, alpha=alpha, ghost=ghost, shake=shake)
 
     def _draw_mini_piece(self, kind, box_rect, compact=False):
         """Mini preview centered in a card area."""
@@ -205,10 +225,8 @@ class UI:
         if not kind:
             return
 
-        blocks = ROTATIONS[kind][0]
-        minx = min(bx for bx, by in blocks)
-        miny = min(by for bx, by in blocks)
-        blocks = [(bx - minx, by - miny) for bx, by in blocks]
+        shape = SHAPE_TABLE[kind][0]
+        blocks = [(bx - shape.left, by - shape.top) for bx, by in shape.blocks]
 
         col = COLORS[kind]
         for bx, by in blocks:
@@ -219,7 +237,7 @@ class UI:
             pygame.draw.rect(self.screen, add_color(col, 35), hi, border_radius=5)
 
     # --- Panels like screenshot ---
-    def draw_panel(self, game, t, high_score=0, shake=(0, 0)):
+    def draw_panel(self, game, t, high_score=0, shake=(0, 0), finesse=None):
         sx, sy = int(shake[0]), int(shake[1])
 
         lp = self.left_panel_rect().move(sx, sy)
@@ -261,6 +279,15 @@ class UI:
         draw_text(self.screen, self.font, "LEVEL", (sx0, sy0 + 148), S.MUTED)
         draw_text(self.screen, self.font_big, str(game.level), (sx0, sy0 + 170), S.TEXT)
 
+        # Finesse faults (extra key presses vs. the minimal sequence)
+        if finesse is not None:
+            fin = pygame.Rect(x, stats.bottom + 18, w, 76)
+            self._draw_card(fin)
+            draw_text(self.screen, self.font, "FINESSE", (sx0, fin.y + 14), S.MUTED)
+            draw_text(self.screen, self.font_big, str(finesse.faults), (sx0, fin.y + 36), S.TEXT)
+            draw_text(self.screen, self.font, f"{finesse.faulty}/{finesse.pieces} pcs",
+                      (fin.right - self.card_pad, fin.y + 44), S.MUTED, align="topright")
+
         # RIGHT: Next stack + Controls
         x = rp.x + self.panel_pad
         y = rp.y + self.panel_pad
@@ -310,6 +337,55 @@ class UI:
         draw_text(self.screen, self.font_huge, "GAME OVER", (cx, cy - 26), (255, 170, 175), align="center")
         draw_text(self.screen, self.font, "R: Restart    ENTER: Menu", (cx, cy + 34), S.TEXT, align="center")
 
+    # --- Versus ---
+    def versus_views(self):
+        """Two UIs on this screen with their boards side by side, each with a
+        narrow column (draw_versus_side) on its outer edge."""
+        side = 96
+        xs = (S.PAD + side, self.w - S.PAD - side - self.board_px_w)
+        return tuple(UI(self.screen, board_x=x) for x in xs)
+
+    def draw_versus_side(self, game, incoming, sent, left, shake=(0, 0)):
+        """Hold, next pieces and counters beside the board (outer edge), and
+        the incoming-garbage meter along the board's inner edge."""
+        sx, sy = int(shake[0]), int(shake[1])
+        br = self.board_rect().move(sx, sy)
+        w = 84
+        x = br.x - 12 - w if left else br.right + 12
+
+        hold = pygame.Rect(x, br.y, w, 96)
+        self._draw_card(hold)
+        draw_text(self.screen, self.font, "HOLD", (hold.centerx, hold.y + 10), S.MUTED, align="midtop")
+        self._draw_mini_piece(game.hold_kind, pygame.Rect(hold.x, hold.y + 28, w, 60), compact=True)
+
+        nxt = pygame.Rect(x, hold.bottom + 12, w, 300)
+        self._draw_card(nxt)
+        draw_text(self.screen, self.font, "NEXT", (nxt.centerx, nxt.y + 10), S.MUTED, align="midtop")
+        for i, kind in enumerate(game.queue[:4]):
+            self._draw_mini_piece(kind, pygame.Rect(nxt.x, nxt.y + 32 + i * 66, w, 66), compact=True)
+
+        stats = pygame.Rect(x, nxt.bottom + 12, w, br.bottom - nxt.bottom - 12)
+        self._draw_card(stats)
+        for i, (label, value) in enumerate((("LINES", game.lines), ("SENT", sent))):
+            yy = stats.y + 14 + i * 76
+            draw_text(self.screen, self.font, label, (stats.centerx, yy), S.MUTED, align="midtop")
+            draw_text(self.screen, self.font_big, str(value), (stats.centerx, yy + 22), S.TEXT, align="midtop")
+
+        # Incoming garbage rises from the bottom of the meter
+        if incoming:
+            h = min(incoming, S.ROWS) * S.TILE
+            mx = br.right + 2 if left else br.x - 8
+            pygame.draw.rect(self.screen, (235, 80, 90), pygame.Rect(mx, br.bottom - h, 6, h), border_radius=3)
+
+    def draw_versus_result(self, winner, shake=(0, 0)):
+        overlay = pygame.Surface(self.screen.get_size(), pygame.SRCALPHA)
+        overlay.fill((0, 0, 0, 150))
+        self.screen.blit(overlay, (0, 0))
+        cx, cy = self.screen.get_width() // 2, self.screen.get_height() // 2
+        title = "DRAW" if winner < 0 else f"PLAYER {winner + 1} WINS"
+        draw_text(self.screen, self.font_huge, title, (cx, cy - 26), S.TEXT, align="center")
+        draw_text(self.screen, self.font, "R: Rematch    ENTER: Menu", (cx, cy + 34), S.TEXT, align="center")
+
     def draw_pause_overlay(self, shake=(0, 0)):
         overlay = pygame.Surface(self.screen.get_size(), pygame.SRCALPHA)
         overlay.fill((0, 0, 0, 120))
@@ -321,7 +397,46 @@ class UI:
         draw_text(self.screen, self.font_huge, "PAUSED", (cx, cy - 18), S.TEXT, align="center")
         draw_text(self.screen, self.font, "Press P to resume", (cx, cy + 38), S.MUTED, align="center")
 
-    def draw_title_screen(self, t, high_score=0, shake=(0, 0)):
+    def draw_practice_hint(self, saved, shake=(0, 0)):
+        br = self.board_rect()
+        label = f"PRACTICE  BKSP: Rewind ({saved})  SHIFT+BKSP: x10"
+        draw_text(self.screen, self.font, label, (br.centerx, br.bottom - 10), S.MUTED, align="midbottom")
+
+    def draw_pc_hint(self, steps, shake=(0, 0)):
+        """Perfect-clear route: the next placement filled faintly, the ones
+        after it as outlines."""
+        for i, (kind, _, cells) in enumerate(steps):
+            for x, y in cells:
+                vy = y - S.HIDDEN_ROWS if y is not None else -1
+                if 0 <= vy < S.ROWS:
+                    self.draw_tile(x, vy, COLORS[kind], alpha=90 if i == 0 else 255, ghost=i > 0, shake=shake)
+        br = self.board_rect()
+        label = f"PERFECT CLEAR IN {len(steps)}" + ("  (HOLD FIRST)" if steps[0][1] else "")
+        draw_text(self.screen, self.font, label, (br.centerx, br.y + 10), S.MUTED, align="midtop")
+
+    def draw_bot_hud(self, pps, shake=(0, 0)):
+        br = self.board_rect()
+        label = f"AUTOPLAY  {pps} PPS  ESC: Menu"
+        draw_text(self.screen, self.font, label, (br.centerx, br.bottom - 10), S.MUTED, align="midbottom")
+
+    def draw_replay_bar(self, pos, total, rate, shake=(0, 0)):
+        br = self.board_rect()
+        bar = pygame.Rect(br.x + 14, br.bottom - 22, br.w - 28, 8)
+        pygame.draw.rect(self.screen, S.CARD_BG2, bar, border_radius=4)
+        if total > 0:
+            fill = bar.copy()
+            fill.w = max(8, int(bar.w * min(1.0, pos / total)))
+            pygame.draw.rect(self.screen, S.BOARD_FRAME, fill, border_radius=4)
+
+        def mmss(ticks):
+            sec = ticks // rate
+            return f"{sec // 60:02d}:{sec % 60:02d}"
+
+        label = f"REPLAY  {mmss(pos)} / {mmss(total)}   ←/→ 5s  ↑/↓ 1m"
+        draw_text(self.screen, self.font, label, (bar.centerx, bar.y - 6), S.MUTED, align="midbottom")
+
+    def draw_title_screen(self, t, high_score=0, shake=(0, 0), has_replay=False, can_resume=False,
+                          confirm_discard=False):
         br = self.board_rect()
         cx, cy = br.center
         pulse = 0.5 + 0.5 * math.sin(t * 2.6)
@@ -335,8 +450,12 @@ class UI:
         draw_text(self.screen, self.font, "High Score", (card.x + 18, card.y + 18), S.MUTED)
         draw_text(self.screen, self.font_big, str(high_score), (card.right - 18, card.y + 14), S.TEXT, align="topright")
 
-        draw_text(self.screen, self.font_big, "Press ENTER to Play", (cx, card.y + 84), S.TEXT, align="center")
-        draw_text(self.screen, self.font, "F1: Help    ESC: Quit", (cx, card.y + 126), S.MUTED, align="center")
+        play = "ENTER: New Game   R: Resume" if can_resume else "Press ENTER to Play"
+        if confirm_discard:
+            play = "ENTER: Discard Run   R: Resume"
+        draw_text(self.screen, self.font_big, play, (cx, card.y + 84), S.TEXT, align="center")
+        hint = "F1: Help  T: Practice  A: Bot  2: Versus  V: Replay  ESC: Quit" if has_replay else "F1: Help   T: Practice   A: Bot   2: Versus   ESC: Quit"
+        draw_text(self.screen, self.font, hint, (cx, card.y + 126), S.MUTED, align="center")
         if pulse > 0.35:
             draw_text(self.screen, self.font, "Tip: SPACE to drop fast, C to hold", (cx, card.y + 156), S.MUTED, align="center")
 
@@ -359,6 +478,7 @@ class UI:
             ("Hold", "C"),
             ("Pause", "P"),
             ("Reset run", "R"),
+            ("Rewind (practice)", "BACKSPACE"),
             ("Back", "ESC"),
         ]
         for a, b in rows:
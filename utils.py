@@ -17,11 +17,21 @@ def draw_text(surf, font, text, pos, color, align="topleft"):
     surf.blit(img, r)
     return r
 
+# Glow layers by (size, color, style): every board tile draws one per frame
+_GLOWS = {}
+
 def glow_rect(surface, rect, color, intensity=120, passes=2, radius=10):
-    for i in range(passes):
-        t = (i + 1) / passes
-        alpha = int(intensity * (1.0 - t) * 0.9)
-        pad = int(radius * t * 1.2)
-        glow = pygame.Surface((rect.w + pad * 2, rect.h + pad * 2), pygame.SRCALPHA)
-        pygame.draw.rect(glow, (*color, alpha), glow.get_rect(), border_radius=int(radius * t + 2))
+    key = (rect.w, rect.h, tuple(color), intensity, passes, radius)
+    layers = _GLOWS.get(key)
+    if layers is None:
+        layers = []
+        for i in range(passes):
+            t = (i + 1) / passes
+            alpha = int(intensity * (1.0 - t) * 0.9)
+            pad = int(radius * t * 1.2)
+            glow = pygame.Surface((rect.w + pad * 2, rect.h + pad * 2), pygame.SRCALPHA)
+            pygame.draw.rect(glow, (*color, alpha), glow.get_rect(), border_radius=int(radius * t + 2))
+            layers.append((glow, pad))
+        _GLOWS[key] = layers
+    for glow, pad in layers:
         surface.blit(glow, (rect.x - pad, rect.y - pad), special_flags=pygame.BLEND_PREMULTIPLIED)
@@ -0,0 +1,171 @@
+# vecenv.py
+import os
+import sys
+import time
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from settings import S
+from pieces import mix
+from tetris import Game, KIND_CODE, QUEUE_LEN
+from batch import place
+
+# Bits of a row mask as a row of 0/1 cells: ROW_CELLS[mask] -> (COLS,)
+ROW_CELLS = ((np.arange(1 << S.COLS)[:, None] >> np.arange(S.COLS)) & 1).astype(np.uint8)
+
+
+def _layout(n):
+    """name -> (dtype, shape, offset) of every array in the shared buffer."""
+    fields = [
+        ("board", np.uint8, (n, S.ROWS, S.COLS)),   # visible cells, 1 == filled
+        ("queue", np.uint8, (n, QUEUE_LEN)),        # kind codes (tetris.KIND_CODE)
+        ("hold", np.uint8, (n,)),                   # 0 == empty
+        ("piece", np.int8, (n, 4)),                 # kind code, x, y, rot
+        ("action", np.int8, (n, 3)),                # turns, dx, hold (see batch.place)
+        ("reward", np.float32, (n,)),               # score gained this step
+        ("done", np.bool_, (n,)),                   # game ended; already reset
+    ]
+    out, off = {}, 0
+    for name, dtype, shape in fields:
+        off = -(-off // 8) * 8
+        out[name] = (dtype, shape, off)
+        off += int(np.prod(shape)) * np.dtype(dtype).itemsize
+    return out, off
+
+
+def _views(buf, layout):
+    return {name: np.ndarray(shape, dtype, buffer=buf, offset=off)
+            for name, (dtype, shape, off) in layout.items()}
+
+
+def _observe(v, i, game):
+    v["board"][i] = ROW_CELLS[game.masks[game.hid:]]
+    v["queue"][i] = [KIND_CODE[k] for k in game.queue]
+    v["hold"][i] = KIND_CODE.get(game.hold_kind, 0)
+    c = game.cur
+    v["piece"][i] = (KIND_CODE[c.kind], c.x, c.y, c.rot)
+
+
+def _worker(shm_name, n, lo, hi, seed, conn):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    v = _views(shm.buf, _layout(n)[0])
+    episodes = [0] * (hi - lo)
+
+    def new_game(i):
+        episodes[i - lo] += 1
+        return Game(seed=mix(seed, i, episodes[i - lo]), clear_anim=False)
+
+    games = {}
+    try:
+        while True:
+            msg = conn.recv_bytes()
+            if msg == b"q":
+                break
+            if msg == b"r":
+                for i in range(lo, hi):
+                    games[i] = new_game(i)
+                    _observe(v, i, games[i])
+                v["reward"][lo:hi] = 0
+                v["done"][lo:hi] = False
+            else:
+                act = v["action"][lo:hi].tolist()
+                for i, (turns, dx, hold) in enumerate(act, lo):
+                    g = games[i]
+                    before = g.score
+                    place(g, turns, dx, hold)
+                    v["reward"][i] = g.score - before
+                    v["done"][i] = g.dead
+                    if g.dead:
+                        g = games[i] = new_game(i)
+                    _observe(v, i, g)
+            conn.send_bytes(b".")
+    finally:
+        del v
+        shm.close()
+
+
+class VecEnv:
+    """`num_envs` Games spread over `workers` processes. Observations,
+    actions, rewards and done flags live in one shared-memory block (the
+    numpy views below); each step only sends a byte to and from each worker.
+    Ended games reset themselves, with `done` set for that step."""
+
+    def __init__(self, num_envs, workers=None, seed=0):
+        self.num_envs = num_envs
+        workers = min(num_envs, workers or os.cpu_count() or 1)
+        layout, size = _layout(num_envs)
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        v = _views(self.shm.buf, layout)
+        self.board, self.queue, self.hold, self.piece = v["board"], v["queue"], v["hold"], v["piece"]
+        self.action, self.reward, self.done = v["action"], v["reward"], v["done"]
+
+        self.conns, self.procs = [], []
+        bounds = np.linspace(0, num_envs, workers + 1).astype(int)
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            parent, child = mp.Pipe()
+            p = mp.Process(target=_worker, args=(self.shm.name, num_envs, lo, hi, seed, child),
+                           daemon=True)
+            p.start()
+            child.close()
+            self.conns.append(parent)
+            self.procs.append(p)
+
+    def _sync(self, msg):
+        for c in self.conns:
+            c.send_bytes(msg)
+        for c in self.conns:
+            c.recv_bytes()
+
+    def obs(self):
+        return {"board": self.board, "queue": self.queue, "hold": self.hold, "piece": self.piece}
+
+    def reset(self):
+        self._sync(b"r")
+        return self.obs()
+
+    def step(self, actions):
+        """actions: (num_envs, 3) of (turns, dx, hold). The returned arrays are
+        the shared buffers themselves; copy them to keep a step around."""
+        self.action[:] = actions
+        self._sync(b"s")
+        return self.obs(), self.reward, self.done
+
+    def close(self):
+        if self.shm is None:
+            return
+        for c in self.conns:
+            try:
+                c.send_bytes(b"q")
+            except (BrokenPipeError, OSError):
+                pass
+        for p in self.procs:
+            p.join(timeout=5)
+        self.board = self.queue = self.hold = self.piece = None
+        self.action = self.reward = self.done = None
+        self.shm.close()
+        self.shm.unlink()
+        self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    envs = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    steps = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    rng = np.random.default_rng(0)
+    for workers in sorted({1, 2, 4, os.cpu_count() or 1}):
+        with VecEnv(envs, workers) as env:
+            env.reset()
+            t0 = time.perf_counter()
+            for _ in range(steps):
+                acts = np.stack([rng.integers(0, 4, envs), rng.integers(-5, 6, envs),
+                                 rng.random(envs) < 0.1], axis=1)
+                env.step(acts)
+            dt = time.perf_counter() - t0
+        print(f"{workers:3d} workers: {envs * steps / dt:,.0f} steps/s")
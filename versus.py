@@ -0,0 +1,134 @@
+# versus.py
+import sys
+import time
+import random
+from collections import deque
+
+from tetris import Game
+
+# Garbage rows sent per line clear; a back-to-back tetris adds B2B_BONUS,
+# consecutive clears add COMBO[combo], a perfect clear sends PC_ATTACK
+ATTACK = {1: 0, 2: 1, 3: 2, 4: 4}
+COMBO = (0, 0, 1, 1, 1, 2, 2, 3, 3, 4, 4, 4, 5)
+B2B_BONUS = 1
+PC_ATTACK = 10
+# Most garbage rows that rise after one piece; the rest wait for the next
+GARBAGE_CAP = 8
+
+
+class _Side:
+    """Per-player observer: a lock that cleared lines attacks, one that
+    didn't lets the waiting garbage rise (both once the next piece spawns,
+    i.e. after the clear)."""
+
+    def __init__(self, match, i):
+        self.match = match
+        self.i = i
+        self.locked = False
+        self.lines = 0
+
+    def on_lock(self, game):
+        self.locked = True
+        self.lines = 0
+
+    def on_clear(self, game, rows):
+        self.lines = len(rows)
+
+    def on_spawn(self, game):
+        if not self.locked:
+            return
+        self.locked = False
+        if self.lines:
+            self.match._attack(self.i, self.lines, not any(game.masks))
+        else:
+            self.match.combo[self.i] = -1
+            self.match._rise(self.i)
+
+
+class Versus:
+    """Two Games on the same piece sequence, sending each other garbage."""
+
+    def __init__(self, seed=None, randomizer="7bag", effects=(None, None), clear_anim=True):
+        self.seed = random.getrandbits(32) if seed is None else seed
+        self.games = [Game(effects=e, seed=self.seed, fixed_tick=True, clear_anim=clear_anim,
+                           randomizer=randomizer) for e in effects]
+        self.rng = random.Random(self.seed)
+        self.incoming = [deque(), deque()]   # [rows, hole column] per attack, oldest first
+        self.combo = [-1, -1]
+        self.b2b = [False, False]
+        self.sent = [0, 0]
+        for i, g in enumerate(self.games):
+            g.observers.append(_Side(self, i))
+
+    def pending(self, i):
+        return sum(n for n, _ in self.incoming[i])
+
+    @property
+    def winner(self):
+        """None while both play, else the survivor's index (-1: both out)."""
+        a, b = (g.dead for g in self.games)
+        if not (a or b):
+            return None
+        return -1 if a and b else (1 if a else 0)
+
+    def step(self, inputs, ticks=1):
+        if self.winner is not None:
+            return
+        for g, bits in zip(self.games, inputs):
+            g.step(bits, ticks)
+
+    def toggle_pause(self):
+        for g in self.games:
+            g.toggle_pause()
+
+    def _attack(self, i, lines, perfect):
+        self.combo[i] += 1
+        n = ATTACK[lines] + COMBO[min(self.combo[i], len(COMBO) - 1)]
+        if lines == 4:
+            n += B2B_BONUS if self.b2b[i] else 0
+            self.b2b[i] = True
+        else:
+            self.b2b[i] = False
+        if perfect:
+            n = PC_ATTACK
+        self.sent[i] += n
+        # Cancel our own waiting garbage first, send what's left
+        own = self.incoming[i]
+        while n and own:
+            k = min(n, own[0][0])
+            own[0][0] -= k
+            n -= k
+            if not own[0][0]:
+                own.popleft()
+        if n:
+            self.incoming[1 - i].append([n, self.rng.randrange(self.games[i].cols)])
+
+    def _rise(self, i):
+        waiting = self.incoming[i]
+        holes = []
+        while waiting and len(holes) < GARBAGE_CAP:
+            k = min(waiting[0][0], GARBAGE_CAP - len(holes))
+            holes += [waiting[0][1]] * k
+            waiting[0][0] -= k
+            if not waiting[0][0]:
+                waiting.popleft()
+        # Oldest attack at the bottom
+        self.games[i].add_garbage(holes[::-1])
+
+
+if __name__ == "__main__":
+    # Bot vs bot: garbage traffic and engine time per simulated tick
+    from bot import Bot
+    seed = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+    vs = Versus(seed, clear_anim=False)
+    bots = [Bot(), Bot({"holes": -0.6})]
+    t0 = time.perf_counter()
+    pieces = 0
+    while vs.winner is None and pieces < 4000:
+        for g, bot in zip(vs.games, bots):
+            if not g.dead and bot.play(g) is not None:
+                pieces += 1
+        vs.step((0, 0), 1)
+    dt = time.perf_counter() - t0
+    print(f"winner {vs.winner} after {pieces} pieces, sent {vs.sent}, "
+          f"lines {[g.lines for g in vs.games]}, {pieces / dt:.0f} pieces/s")